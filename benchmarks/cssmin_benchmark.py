@@ -0,0 +1,50 @@
+"""
+Benchmark comparing ``cssmin`` with the chained ``str.replace`` calls
+``utils.minify_css`` used before, on the sample project's stylesheets
+repeated to a larger size.
+
+Run it from the repository root:
+
+    python benchmarks/cssmin_benchmark.py [repeat] [copies]
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sample_project.settings')
+
+from minify.cssmin import cssmin
+
+CSS_FILES = [
+    os.path.join(ROOT, 'sample_project', 'media', 'css', 'libs', 'reset.css'),
+    os.path.join(ROOT, 'sample_project', 'media', 'css', 'main.css'),
+]
+
+
+def replace_minify_css(css):
+    return css.replace('\t', '').replace('\n', '').replace(', ', ',').replace(': ', ':').replace(' {', '{').replace('} ', '}')
+
+def best_of(function, argument, repeat):
+    timings = []
+    for i in range(repeat):
+        start = time.time()
+        function(argument)
+        timings.append(time.time() - start)
+    return min(timings)
+
+def main(repeat=5, copies=200):
+    css = '\n'.join(open(path, 'r').read() for path in CSS_FILES) * copies
+    size = len(css) / 1024.0 / 1024.0
+    print 'sample stylesheets x %d, %d bytes, best of %d' % (copies, len(css), repeat)
+    for name, function in (('str.replace', replace_minify_css), ('cssmin', cssmin)):
+        timing = best_of(function, css, repeat)
+        minified = len(function(css))
+        print '%-12s %8d bytes (%5.1f%%) %8.1f ms %7.2f MB/s' % (
+            name, minified, 100.0 * minified / len(css), timing * 1000, size / timing)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,78 @@
+"""
+Benchmark of the startup cost of the app: the time and the number of
+modules it takes to import the modules loaded by management commands,
+worker processes and the template tags, each in a fresh interpreter.
+
+Also reports whether an import loaded the URLconf, httplib or
+multiprocessing, which only the processes using them should pay for.
+
+Run it from the repository root:
+
+    python benchmarks/import_benchmark.py [repeat]
+"""
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#statements run in a fresh interpreter, after django.conf.settings is set up
+CASES = [
+    ('minify', 'import minify'),
+    ('minify.utils', 'import minify.utils'),
+    ('minify.views', 'import minify.views'),
+    ('minify_tags', 'import minify.templatetags.minify_tags'),
+    ('minify_build command', 'import minify.management.commands.minify_build'),
+    ('minify_warm command', 'import minify.management.commands.minify_warm'),
+]
+#modules which shouldn't be loaded just by importing the app
+HEAVY = [
+    ('urlconf', 'sample_project.urls'),
+    ('httplib', 'httplib'),
+    ('multiprocessing', 'multiprocessing'),
+]
+
+SCRIPT = """
+import sys, time
+sys.path.insert(0, %(root)r)
+sys.path.insert(0, %(project)r)
+import os
+os.environ['DJANGO_SETTINGS_MODULE'] = 'sample_project.settings'
+from django.conf import settings
+settings.INSTALLED_APPS
+before = set(sys.modules)
+start = time.time()
+%(statement)s
+seconds = time.time() - start
+loaded = [name for name in set(sys.modules) - before if sys.modules[name] is not None]
+heavy = [label for label, name in %(heavy)r if name in sys.modules]
+print seconds, len(loaded), ','.join(heavy)
+"""
+
+
+def measure(statement):
+    """Returns the seconds and the number of modules of ``statement``
+    in a fresh interpreter and the heavy modules it loaded"""
+    script = SCRIPT % {
+        'root': ROOT,
+        'project': os.path.join(ROOT, 'sample_project'),
+        'statement': statement,
+        'heavy': HEAVY,
+    }
+    output = subprocess.Popen([sys.executable, '-c', script], cwd=ROOT,
+                              stdout=subprocess.PIPE).communicate()[0]
+    seconds, modules, heavy = (output.strip().split(' ') + [''])[:3]
+    return float(seconds), int(modules), heavy
+
+def main(argv=None):
+    argv = argv or sys.argv
+    repeat = len(argv) > 1 and int(argv[1]) or 5
+    for name, statement in CASES:
+        runs = [measure(statement) for i in range(repeat)]
+        seconds, modules, heavy = min(runs)
+        print '%-24s %8.1f ms %5d modules  %s' % (name, seconds * 1000, modules, heavy)
+
+
+if __name__ == '__main__':
+    main()
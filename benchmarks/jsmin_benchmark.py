@@ -0,0 +1,50 @@
+"""
+Benchmark comparing ``jsmin`` with the original character at a time
+``JavascriptMinify`` on the sample project's jQuery.
+
+Run it from the repository root:
+
+    python benchmarks/jsmin_benchmark.py [repeat]
+"""
+
+import os
+import sys
+import time
+from StringIO import StringIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sample_project.settings')
+
+from minify.jsmin import jsmin, JavascriptMinify
+
+JQUERY = os.path.join(ROOT, 'sample_project', 'media', 'js', 'jquery', 'jquery-1.5.1.js')
+
+
+def reference_jsmin(js):
+    outs = StringIO()
+    JavascriptMinify().minify(StringIO(js), outs)
+    return outs.getvalue().lstrip('\n')
+
+def best_of(function, argument, repeat):
+    timings = []
+    for i in range(repeat):
+        start = time.time()
+        function(argument)
+        timings.append(time.time() - start)
+    return min(timings)
+
+def main(repeat=5):
+    js = open(JQUERY, 'r').read()
+    assert jsmin(js) == reference_jsmin(js)
+    size = len(js) / 1024.0 / 1024.0
+    reference = best_of(reference_jsmin, js, repeat)
+    regex = best_of(jsmin, js, repeat)
+    print 'jquery-1.5.1.js, %d bytes, best of %d' % (len(js), repeat)
+    print 'JavascriptMinify: %8.1f ms %6.2f MB/s' % (reference * 1000, size / reference)
+    print 'jsmin:            %8.1f ms %6.2f MB/s' % (regex * 1000, size / regex)
+    print 'speedup:          %8.1fx' % (reference / regex)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
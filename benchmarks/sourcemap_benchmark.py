@@ -0,0 +1,70 @@
+"""
+Benchmark showing the overhead of tracking source map offsets in
+``jsmin`` and ``cssmin``, and of building the whole source map, on
+jQuery and the sample project's stylesheets repeated to a larger size.
+
+Run it from the repository root:
+
+    python benchmarks/sourcemap_benchmark.py [repeat] [copies]
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sample_project.settings')
+
+from minify import sourcemap
+from minify.cssmin import cssmin
+from minify.jsmin import jsmin
+
+JQUERY = os.path.join(ROOT, 'sample_project', 'media', 'js', 'jquery', 'jquery-1.5.1.js')
+CSS_FILES = [
+    os.path.join(ROOT, 'sample_project', 'media', 'css', 'libs', 'reset.css'),
+    os.path.join(ROOT, 'sample_project', 'media', 'css', 'main.css'),
+]
+
+
+def best_of(function, argument, repeat):
+    timings = []
+    for i in range(repeat):
+        start = time.time()
+        function(argument)
+        timings.append(time.time() - start)
+    return min(timings)
+
+def with_offsets(minifier):
+    def minify(content):
+        return minifier(content, [])
+    return minify
+
+def with_source_map(minifier):
+    def minify(content):
+        offsets = []
+        minified = minifier(content, offsets)
+        source_map = sourcemap.SourceMap()
+        source = source_map.add_source('source', content)
+        source_map.add_offsets(0, source, minified, content, offsets)
+        return source_map.to_json()
+    return minify
+
+def main(repeat=5, copies=200):
+    js = open(JQUERY, 'r').read()
+    css = '\n'.join(open(path, 'r').read() for path in CSS_FILES) * copies
+    for name, minifier, content in (('jquery-1.5.1.js', jsmin, js),
+                                    ('stylesheets x %d' % copies, cssmin, css)):
+        size = len(content) / 1024.0 / 1024.0
+        print '%s, %d bytes, best of %d' % (name, len(content), repeat)
+        baseline = best_of(minifier, content, repeat)
+        for label, function in (('minify', minifier),
+                                ('minify + offsets', with_offsets(minifier)),
+                                ('minify + source map', with_source_map(minifier))):
+            timing = label == 'minify' and baseline or best_of(function, content, repeat)
+            print '%-20s %8.1f ms %7.2f MB/s %+6.1f%%' % (
+                label, timing * 1000, size / timing, 100.0 * (timing - baseline) / baseline)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
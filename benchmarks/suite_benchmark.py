@@ -0,0 +1,313 @@
+"""
+Benchmark suite of the minifiers, of building bundles and of the minify
+views, on the sample project's files (jQuery, jQuery UI) and generated
+Javascript and CSS of a given size. Nothing is fetched from the network.
+
+Reports the throughput in MB/s, the p50 and p99 latency of the views
+with a cold cache (cleared before every request) and a warm one, and
+the peak memory (RSS) of every benchmark, which runs in a process of
+its own. With ``--json`` the results are written to a file (``-`` for
+stdout), to compare them between revisions.
+
+Run it from the repository root:
+
+    python benchmarks/suite_benchmark.py [--repeat=5] [--requests=50] [--size=1024] [--json=results.json]
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from optparse import OptionParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'sample_project'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sample_project.settings')
+
+#the generated files are served from a directory of their own
+GENERATED_ROOT = tempfile.mkdtemp(prefix='minify-benchmark-')
+from django.conf import settings
+settings.MINIFY_PATHS = list(settings.MINIFY_PATHS) + [GENERATED_ROOT]
+
+import django
+from django import http
+from django.core.cache import cache
+from django.utils import simplejson
+
+from minify import executors
+from minify import utils
+from minify import views
+from minify.cssmin import cssmin
+from minify.jsmin import jsmin
+
+MEDIA_JS = os.path.join(ROOT, 'sample_project', 'media', 'js')
+MEDIA_CSS = os.path.join(ROOT, 'sample_project', 'media', 'css')
+JQUERY = 'jquery/jquery-1.5.1.js'
+JQUERY_UI = 'jquery/ui/jquery-ui-1.8.10.custom.js'
+JQUERY_UI_FILES = sorted('jquery/ui/%s' % filename
+                         for filename in os.listdir(os.path.join(MEDIA_JS, 'jquery', 'ui'))
+                         if filename.startswith('jquery.'))
+CSS_FILES = ['libs/reset.css', 'main.css']
+GENERATED_JS = 'generated.js'
+GENERATED_CSS = 'generated.css'
+
+
+def generate_js(size, seed=0):
+    """Returns about ``size`` bytes of Javascript with comments,
+    strings, regular expressions and indentation to remove"""
+    random_ = random.Random(seed)
+    parts = ['/*\n * generated for benchmarking\n */\n']
+    length = len(parts[0])
+    index = 0
+    while length < size:
+        part = ('// function %(index)d\n'
+                'function handler%(index)d(event, options) {\n'
+                '    var value = options.value + %(number)d,\n'
+                '        label = "label " + \'%(index)d\' + value;\n'
+                '    if ( /^[a-z]+\\d*$/i.test( label ) ) {\n'
+                '        return label.replace( /\\s+/g, "-" ) ;\n'
+                '    }\n'
+                '    /* fall back to the default */\n'
+                '    return value  *  2 ;\n'
+                '}\n\n') % {'index': index, 'number': random_.randint(0, 1000)}
+        parts.append(part)
+        length += len(part)
+        index += 1
+    return ''.join(parts)
+
+def generate_css(size, seed=0):
+    """Returns about ``size`` bytes of CSS with comments and whitespace"""
+    random_ = random.Random(seed)
+    parts = []
+    length = 0
+    index = 0
+    while length < size:
+        part = ('/* rule %(index)d */\n'
+                '.block-%(index)d ul li a:hover, #id-%(index)d > span {\n'
+                '\tcolor: #%(color)06x;\n'
+                '\tmargin: 0px 0px %(number)dpx 0px;\n'
+                '\tbackground: url( "images/%(index)d.png" ) no-repeat ;\n'
+                '}\n\n') % {'index': index, 'color': random_.randint(0, 0xffffff),
+                            'number': random_.randint(0, 100)}
+        parts.append(part)
+        length += len(part)
+        index += 1
+    return ''.join(parts)
+
+def read_media(kind, filenames):
+    root = kind == 'js' and MEDIA_JS or MEDIA_CSS
+    return '\n'.join(open(os.path.join(root, filename), 'rb').read() for filename in filenames)
+
+
+def percentile(timings, percent):
+    """Returns the ``percent`` percentile of ``timings`` (nearest rank)"""
+    timings = sorted(timings)
+    index = max(0, int(round(percent / 100.0 * len(timings))) - 1)
+    return timings[index]
+
+def clear_caches():
+    """Forgets everything minified and hashed before"""
+    cache.clear()
+    utils._file_digests.clear()
+
+def make_request(kind, files):
+    request = http.HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = '/minify/%s/' % kind
+    request.GET = http.QueryDict('files=%s' % ','.join(files))
+    request.META['HTTP_ACCEPT_ENCODING'] = 'gzip'
+    return request
+
+def view_latencies(kind, files, requests, cold):
+    """Returns the seconds of ``requests`` requests of a minify view"""
+    view = kind == 'js' and views.js_minify or views.css_minify
+    clear_caches()
+    if not cold:
+        view(make_request(kind, files))
+    timings = []
+    for i in range(requests):
+        if cold:
+            clear_caches()
+        request = make_request(kind, files)
+        start = time.time()
+        response = view(request)
+        response.content
+        timings.append(time.time() - start)
+        assert response.status_code == 200, response.status_code
+    return timings
+
+
+def bench_minifier(minifier, content, repeat):
+    timings = []
+    for i in range(repeat):
+        start = time.time()
+        minified = minifier(content)
+        timings.append(time.time() - start)
+    return {
+        'bytes': len(content),
+        'minified_bytes': len(minified),
+        'seconds': min(timings),
+        'mb_per_s': len(content) / 1024.0 / 1024.0 / min(timings),
+    }
+
+def bench_bundle(kind, files, repeat, cold):
+    minifier, version = utils.MINIFIERS[kind]
+    clear_caches()
+    if not cold:
+        #fills the cache, not timed
+        utils.minify_from_files(None, files, minifier, version)
+    timings = []
+    for i in range(repeat):
+        if cold:
+            clear_caches()
+        start = time.time()
+        minified = utils.minify_from_files(None, files, minifier, version)
+        timings.append(time.time() - start)
+    size = sum(len(utils.check_and_read_from_file(None, filename)) for filename in files)
+    return {
+        'bytes': size,
+        'minified_bytes': len(minified),
+        'seconds': min(timings),
+        'mb_per_s': size / 1024.0 / 1024.0 / min(timings),
+    }
+
+def bench_view(kind, files, requests, cold):
+    timings = view_latencies(kind, files, requests, cold)
+    size = sum(len(utils.check_and_read_from_file(None, filename)) for filename in files)
+    return {
+        'bytes': size,
+        'requests': requests,
+        'p50_ms': percentile(timings, 50) * 1000,
+        'p99_ms': percentile(timings, 99) * 1000,
+        'mb_per_s': size / 1024.0 / 1024.0 / percentile(timings, 50),
+    }
+
+
+def run_isolated(function, *args):
+    """Runs ``function(*args)`` in a forked process, so every benchmark
+    starts from the same state and its peak memory can be measured.
+    Returns the result of the function and the peak RSS in KB."""
+    if not hasattr(os, 'fork'):
+        return function(*args), None
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if not pid:
+        os.close(read_fd)
+        status = 0
+        try:
+            try:
+                result = simplejson.dumps(function(*args))
+            except Exception, e:
+                result = simplejson.dumps({'error': '%s: %s' % (e.__class__.__name__, e)})
+                status = 1
+            output = os.fdopen(write_fd, 'w')
+            output.write(result)
+            output.close()
+        finally:
+            os._exit(status)
+    os.close(write_fd)
+    input = os.fdopen(read_fd, 'r')
+    result = simplejson.loads(input.read())
+    input.close()
+    pid, status, rusage = os.wait4(pid, 0)
+    #Linux reports KB, Mac OS X bytes
+    peak = rusage.ru_maxrss
+    if sys.platform == 'darwin':
+        peak /= 1024
+    return result, peak
+
+def write_generated(size):
+    open(os.path.join(GENERATED_ROOT, GENERATED_JS), 'wb').write(generate_js(size))
+    open(os.path.join(GENERATED_ROOT, GENERATED_CSS), 'wb').write(generate_css(size))
+
+def benchmarks(options):
+    """Returns a list of ``(name, function, args)`` tuples"""
+    size = options.size * 1024
+    generated_js = generate_js(size)
+    generated_css = generate_css(size)
+    sample_css = read_media('css', CSS_FILES) * max(1, size / len(read_media('css', CSS_FILES)))
+    cases = [
+        ('jsmin jquery', bench_minifier, (jsmin, read_media('js', [JQUERY]), options.repeat)),
+        ('jsmin jquery-ui', bench_minifier, (jsmin, read_media('js', [JQUERY_UI]), options.repeat)),
+        ('jsmin generated', bench_minifier, (jsmin, generated_js, options.repeat)),
+        ('cssmin sample css', bench_minifier, (cssmin, sample_css, options.repeat)),
+        ('cssmin generated', bench_minifier, (cssmin, generated_css, options.repeat)),
+    ]
+    bundles = [
+        ('jquery', 'js', [JQUERY]),
+        ('jquery-ui files', 'js', JQUERY_UI_FILES),
+        ('generated js', 'js', [GENERATED_JS]),
+        ('generated css', 'css', [GENERATED_CSS]),
+    ]
+    for name, kind, files in bundles:
+        for cold in (True, False):
+            state = cold and 'cold' or 'warm'
+            cases.append(('minify_from_files %s %s' % (name, state), bench_bundle,
+                          (kind, files, options.repeat, cold)))
+    for name, kind, files in bundles:
+        for cold in (True, False):
+            state = cold and 'cold' or 'warm'
+            cases.append(('view %s %s' % (name, state), bench_view,
+                          (kind, files, options.requests, cold)))
+    return cases
+
+def format_result(name, result):
+    if 'error' in result:
+        return '%-40s %s' % (name, result['error'])
+    columns = ['%-40s %9d bytes' % (name, result['bytes'])]
+    if 'p50_ms' in result:
+        columns.append('p50 %8.2f ms  p99 %8.2f ms' % (result['p50_ms'], result['p99_ms']))
+    else:
+        columns.append('%8.2f ms' % (result['seconds'] * 1000))
+    columns.append('%7.2f MB/s' % result['mb_per_s'])
+    if result.get('peak_rss_kb') is not None:
+        columns.append('peak %7d KB' % result['peak_rss_kb'])
+    return '  '.join(columns)
+
+def main(argv=None):
+    parser = OptionParser(usage='%prog [options]')
+    parser.add_option('--repeat', type='int', default=5,
+                      help='runs of every minifier and bundle benchmark, the best one counts')
+    parser.add_option('--requests', type='int', default=50,
+                      help='requests of every view benchmark')
+    parser.add_option('--size', type='int', default=1024,
+                      help='size of the generated Javascript and CSS in KB')
+    parser.add_option('--json', dest='json_path',
+                      help='write the results as JSON to this file, - for stdout')
+    options, args = parser.parse_args(argv)
+    #process pools would leave the memory of their workers out
+    executors._executor = executors.SerialExecutor()
+    write_generated(options.size * 1024)
+    results = []
+    output = options.json_path == '-' and sys.stderr or sys.stdout
+    try:
+        baseline, baseline_peak = run_isolated(lambda: {})
+        for name, function, args in benchmarks(options):
+            result, peak = run_isolated(function, *args)
+            result['name'] = name
+            result['peak_rss_kb'] = peak
+            results.append(result)
+            print >> output, format_result(name, result)
+    finally:
+        shutil.rmtree(GENERATED_ROOT, ignore_errors=True)
+    if options.json_path:
+        report = simplejson.dumps({
+            'python': sys.version.split()[0],
+            'django': django.get_version(),
+            'platform': sys.platform,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'options': {'repeat': options.repeat, 'requests': options.requests, 'size': options.size},
+            'baseline_peak_rss_kb': baseline_peak,
+            'results': results,
+        }, indent=2, sort_keys=True)
+        if options.json_path == '-':
+            print report
+        else:
+            open(options.json_path, 'w').write(report)
+
+
+if __name__ == '__main__':
+    main()
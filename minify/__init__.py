@@ -5,5 +5,3 @@ Authors:
 - Torsten Engelbrecht
 
 """
-
-from minify.utils import *
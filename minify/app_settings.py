@@ -2,6 +2,9 @@
 App specific settings for minify
 """
 
+import os
+import tempfile
+
 from django.conf import settings
 
 MINIFY_DEBUG = getattr(settings, 'MINIFY_DEBUG', settings.DEBUG)
@@ -11,3 +14,39 @@ MINIFY_CSS_JS_EXPIRES = getattr(settings, 'MINIFY_CSS_JS_EXPIRES', 5)
 MINIFY_HEADER_CACHE_PRIVATE = getattr(settings, 'MINIFY_HEADER_CACHE_PRIVATE', False)
 #in seconds
 MINIFY_CACHE_DURATION = getattr(settings, 'MINIFY_CACHE_DURATION', 60*60*24*5)
+#cache of minified content per file: 'django', 'disk' or None
+MINIFY_FILE_CACHE = getattr(settings, 'MINIFY_FILE_CACHE', 'django')
+MINIFY_FILE_CACHE_DIR = getattr(settings, 'MINIFY_FILE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'django-minify'))
+#in bytes
+MINIFY_FILE_CACHE_MAX_SIZE = getattr(settings, 'MINIFY_FILE_CACHE_MAX_SIZE', 50*1024*1024)
+#directory and url of the bundles written by the minify_build command
+MINIFY_BUILD_ROOT = getattr(settings, 'MINIFY_BUILD_ROOT', os.path.join(getattr(settings, 'STATIC_ROOT', None) or settings.MEDIA_ROOT, 'minify'))
+MINIFY_BUILD_URL = getattr(settings, 'MINIFY_BUILD_URL', '%sminify/' % (getattr(settings, 'STATIC_URL', None) or settings.MEDIA_URL))
+#'serial', 'process' or the dotted path of an executor class
+MINIFY_EXECUTOR = getattr(settings, 'MINIFY_EXECUTOR', 'serial')
+#number of processes of the 'process' executor, defaults to the number of CPUs
+MINIFY_WORKERS = getattr(settings, 'MINIFY_WORKERS', None)
+#timeout of requests fetching remote files, in seconds
+MINIFY_FETCH_TIMEOUT = getattr(settings, 'MINIFY_FETCH_TIMEOUT', 10)
+#how many remote sources of a bundle are fetched at the same time, while its other files are read
+MINIFY_FETCH_THREADS = getattr(settings, 'MINIFY_FETCH_THREADS', 4)
+#how often the index of files within MINIFY_PATHS is checked for changes, in seconds
+MINIFY_INDEX_CHECK_INTERVAL = getattr(settings, 'MINIFY_INDEX_CHECK_INTERVAL', 2)
+#watch MINIFY_PATHS for changes with pyinotify instead
+MINIFY_INDEX_WATCH = getattr(settings, 'MINIFY_INDEX_WATCH', False)
+#respond with cached gzip (or brotli) compressed bundles if the client accepts them
+MINIFY_PRECOMPRESS = getattr(settings, 'MINIFY_PRECOMPRESS', True)
+#stream minified bundles file by file instead of building them in memory first
+MINIFY_STREAMING = getattr(settings, 'MINIFY_STREAMING', False)
+#keep the content and minified content of files in memory while they don't change
+MINIFY_DEV_CACHE = getattr(settings, 'MINIFY_DEV_CACHE', MINIFY_DEBUG)
+#with MINIFY_DEBUG render one combined, not minified bundle with an inline source map per tag
+MINIFY_DEBUG_COMBINE = getattr(settings, 'MINIFY_DEBUG_COMBINE', False)
+#reference a source map from minified bundles, built when it is requested
+MINIFY_SOURCE_MAPS = getattr(settings, 'MINIFY_SOURCE_MAPS', False)
+#how long a bundle may take to build before another process builds it too, in seconds
+MINIFY_LOCK_TIMEOUT = getattr(settings, 'MINIFY_LOCK_TIMEOUT', 30)
+#receivers of the timing signals: 'log', 'counters' or dotted paths of functions connecting receivers
+MINIFY_INSTRUMENTATION = getattr(settings, 'MINIFY_INSTRUMENTATION', ())
+#let the tags point to chunks of the bundles shared between templates instead of whole bundles
+MINIFY_SPLIT_BUNDLES = getattr(settings, 'MINIFY_SPLIT_BUNDLES', False)
@@ -0,0 +1,121 @@
+"""
+Building bundles ahead of time into content hashed files,
+used by the minify_build management command and the template
+tags which point to these files once they are built
+"""
+
+import hashlib
+import os
+
+from django.utils import simplejson
+
+from minify import app_settings
+from minify import utils
+
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 12
+
+
+def bundle_key(files):
+    """Returns the key of a list of files within the manifest"""
+    return ','.join([f for f in files if f])
+
+def write_bundle(kind, content, build_root=None):
+    """Writes the minified content of a bundle to a file named
+    after a hash of its content.
+
+    Params:
+        - ``kind``: ``'js'`` or ``'css'``
+        - ``content``: the minified content
+        - ``build_root`` (optional): the directory to write to,
+          defaults to ``app_settings.MINIFY_BUILD_ROOT``
+
+    Returns:
+        - the name of the file within ``build_root``
+    """
+    build_root = build_root or app_settings.MINIFY_BUILD_ROOT
+    if isinstance(content, unicode):
+        content = content.encode('utf-8')
+    filename = 'bundle.%s.%s' % (hashlib.sha1(content).hexdigest()[:HASH_LENGTH], kind)
+    path = os.path.join(build_root, filename)
+    if not os.path.exists(path):
+        file = open(path, 'wb')
+        try:
+            file.write(content)
+        finally:
+            file.close()
+    return filename
+
+def build_bundles(bundle_list, build_root=None, executor=None):
+    """Minifies bundles, writes them to content hashed files and
+    writes a manifest mapping them to their file names.
+
+    Params:
+        - ``bundle_list``: a list of ``(kind, files)`` tuples like
+          returned by ``minify.bundles.find_bundles``
+        - ``build_root`` (optional): the directory to write to,
+          defaults to ``app_settings.MINIFY_BUILD_ROOT``
+        - ``executor`` (optional): an executor from ``minify.executors``
+          minifying the files of all bundles
+
+    Returns:
+        - a tuple of the manifest and a list of ``(kind, files, error)``
+          tuples for the bundles which could not be built
+    """
+    build_root = build_root or app_settings.MINIFY_BUILD_ROOT
+    if not os.path.isdir(build_root):
+        os.makedirs(build_root)
+    manifest = {}
+    errors = []
+    try:
+        contents = utils.minify_bundles(None, bundle_list, executor)
+    except Exception:
+        #find out which bundles fail by building them one by one
+        contents = []
+        for kind, files in bundle_list:
+            try:
+                contents.extend(utils.minify_bundles(None, [(kind, files)], executor))
+            except Exception, e:
+                errors.append((kind, files, e))
+                contents.append(None)
+    for (kind, files), content in zip(bundle_list, contents):
+        if content is not None:
+            manifest[bundle_key(files)] = write_bundle(kind, content, build_root)
+    file = open(os.path.join(build_root, MANIFEST_NAME), 'w')
+    try:
+        simplejson.dump(manifest, file, indent=2, sort_keys=True)
+    finally:
+        file.close()
+    return manifest, errors
+
+_manifest = None
+
+def load_manifest():
+    """Returns the manifest written by ``build_bundles``, it is
+    read once per process. If there is none it's an empty dict.
+    """
+    global _manifest
+    if _manifest is None:
+        path = os.path.join(app_settings.MINIFY_BUILD_ROOT, MANIFEST_NAME)
+        try:
+            file = open(path, 'r')
+        except IOError:
+            _manifest = {}
+        else:
+            try:
+                _manifest = simplejson.load(file)
+            finally:
+                file.close()
+    return _manifest
+
+def get_built_url(files):
+    """Returns the url of the built file of a bundle or ``None``
+    if it was not built.
+
+    Params:
+        - ``files``: the list of files combined into the bundle
+    """
+    filename = load_manifest().get(bundle_key(files))
+    if filename:
+        return '%s%s' % (app_settings.MINIFY_BUILD_URL, filename)
+    return None
@@ -0,0 +1,242 @@
+"""
+Cache of the minified content of whole bundles, shared by all requests
+for the same files no matter how their query string is written.
+
+Bundles of files on disk are keyed by their kind and the version of
+their files (``utils.get_files_version``), so a changed file gets a
+new entry. Other bundles (remote files, views) are keyed by their
+normalized list of files and expire after ``MINIFY_CACHE_DURATION``.
+Only the minified content is stored, not whole responses.
+
+A bundle which isn't cached is built by a single thread of a single
+process at a time: a lock per bundle within the process and a lock
+in the cache (``cache.add``) across processes and hosts. Requests
+coming in meanwhile wait for the bundle to be built, or get the last
+built content of the bundle (stale while revalidate).
+"""
+
+import hashlib
+import threading
+import time
+
+from django.core.cache import cache
+
+from minify import app_settings
+from minify import executors
+from minify import signals
+from minify import utils
+
+KEY_PREFIX = 'minify:bundle'
+#how often a request waiting for another process to build a bundle checks the cache, in seconds
+LOCK_POLL_INTERVAL = 0.05
+
+#bundles share a fixed number of locks, so there are no locks to clean up
+_locks = [threading.Lock() for i in range(64)]
+
+_stats = {
+    'hits': 0,
+    'misses': 0,
+}
+
+
+def normalize_files(files):
+    """Returns the list of ``files`` without surrounding whitespace
+    and empty entries, in their order"""
+    return [f.strip() for f in files if f and f.strip()]
+
+def bundle_key(kind, files, url=None):
+    """Build the cache key of a bundle
+
+    Params:
+        - ``kind``: ``'js'`` or ``'css'``
+        - ``files``: the list of files of the bundle
+        - ``url`` (optional): the url of a view the bundle also contains
+
+    Returns:
+        - the cache key
+    """
+    files = normalize_files(files)
+    version = not url and utils.get_files_version(files)
+    if version:
+        return '%s:%s:%s' % (KEY_PREFIX, kind, version)
+    digest = hashlib.sha1('%s\n%s' % (','.join(files), url or '')).hexdigest()
+    return '%s:%s:files-%s' % (KEY_PREFIX, kind, digest)
+
+def _latest_key(kind, files, url=None):
+    """Key of the key of the last built content of a bundle, whatever
+    its version, so the stale content isn't stored twice"""
+    digest = hashlib.sha1('%s\n%s' % (','.join(normalize_files(files)), url or '')).hexdigest()
+    return '%s:%s:latest-%s' % (KEY_PREFIX, kind, digest)
+
+def _get_stale(kind, files, url=None):
+    """Returns the last built content of a bundle or ``None``"""
+    key = cache.get(_latest_key(kind, files, url))
+    if key is None:
+        return None
+    return cache.get(key)
+
+def get_cached(kind, files, url=None):
+    """Returns the cached content of a bundle or ``None``"""
+    content = cache.get(bundle_key(kind, files, url))
+    _stats[content is None and 'misses' or 'hits'] += 1
+    return content
+
+def get_bundle(kind, files, build_func, url=None):
+    """Returns the content of a bundle from the cache or builds
+    and caches it. If another thread or process is building it
+    already this waits for it instead.
+
+    Params:
+        - ``kind``: ``'js'`` or ``'css'``
+        - ``files``: the list of files of the bundle
+        - ``build_func``: a function without arguments returning
+          the minified content, only called if it's not cached
+        - ``url`` (optional): the url of a view the bundle also contains
+
+    Returns:
+        - the minified content
+    """
+    return _get_bundle(kind, files, build_func, url, False)[0]
+
+def get_bundle_or_stale(kind, files, build_func, url=None):
+    """Like ``get_bundle``, but if another thread or process is
+    building the bundle already the content built before (for older
+    versions of the files) is returned, if there is any.
+
+    Returns:
+        - a tuple of the minified content and a flag if it is stale
+    """
+    return _get_bundle(kind, files, build_func, url, True)
+
+def _get_bundle(kind, files, build_func, url, allow_stale):
+    key = bundle_key(kind, files, url)
+    content = cache.get(key)
+    if content is not None:
+        _stats['hits'] += 1
+        return content, False
+    _stats['misses'] += 1
+    lock = _locks[hash(key) % len(_locks)]
+    if not lock.acquire(False):
+        if allow_stale:
+            stale = _get_stale(kind, files, url)
+            if stale is not None:
+                return stale, True
+        lock.acquire()
+    try:
+        #built by another thread meanwhile
+        content = cache.get(key)
+        if content is not None:
+            return content, False
+        lock_key = '%s:lock' % key
+        timeout = app_settings.MINIFY_LOCK_TIMEOUT
+        deadline = time.time() + timeout
+        locked = cache.add(lock_key, 1, timeout)
+        while not locked:
+            if allow_stale:
+                stale = _get_stale(kind, files, url)
+                if stale is not None:
+                    return stale, True
+            if time.time() > deadline:
+                #the other process is gone, build it anyway
+                break
+            time.sleep(LOCK_POLL_INTERVAL)
+            content = cache.get(key)
+            if content is not None:
+                return content, False
+            locked = cache.add(lock_key, 1, timeout)
+        try:
+            start = time.time()
+            content = build_func()
+            signals.bundle_built.send(sender=kind, files=normalize_files(files),
+                                      seconds=time.time() - start, size=len(content))
+            _store(key, kind, files, url, content)
+        finally:
+            if locked:
+                cache.delete(lock_key)
+        return content, False
+    finally:
+        lock.release()
+
+def _store(key, kind, files, url, content):
+    cache.set(key, content, app_settings.MINIFY_CACHE_DURATION)
+    cache.set(_latest_key(kind, files, url), key, app_settings.MINIFY_CACHE_DURATION)
+
+def build_bundle(kind, files, executor=None):
+    """Minifies and combines the files of a bundle into the content
+    the minify views respond with (and cache).
+
+    Params:
+        - ``kind``: ``'js'`` or ``'css'``
+        - ``files``: the list of files of the bundle
+        - ``executor`` (optional): an executor from ``minify.executors``
+          minifying the files, defaults to minifying them one by one
+
+    Returns:
+        - the minified content
+    """
+    content = utils.minify_bundles(None, [(kind, files)], executor or executors.SerialExecutor())[0]
+    if kind == 'js':
+        #like the response of js_minify
+        content = '\n%s' % content
+    return content
+
+def _build_job(bundle):
+    """Builds a ``(kind, files)`` bundle, returning a tuple of the
+    content (``None`` on errors), the seconds it took and the error"""
+    kind, files = bundle
+    start = time.time()
+    try:
+        content = build_bundle(kind, files)
+    except Exception, e:
+        return None, time.time() - start, '%s: %s' % (e.__class__.__name__, e)
+    return content, time.time() - start, None
+
+#the error of bundles warm_bundles skips, the views only read bundles
+#of versioned files on disk from the cache
+NOT_CACHEABLE = 'not cacheable, not all of its files are on disk'
+
+def warm_bundles(bundle_list, executor=None):
+    """Builds bundles into the bundle cache, so the first requests
+    for them don't have to.
+
+    Params:
+        - ``bundle_list``: a list of ``(kind, files)`` tuples like
+          returned by ``minify.bundles.find_bundles``
+        - ``executor`` (optional): an executor from ``minify.executors``
+          building the bundles, defaults to the one configured by
+          ``app_settings.MINIFY_EXECUTOR``
+
+    Returns:
+        - a list of ``(kind, files, seconds, size, error)`` tuples
+          in the order of ``bundle_list``, ``error`` being ``None``
+          if the bundle was built and ``NOT_CACHEABLE`` if it was
+          skipped as it contains remote files or view paths
+    """
+    executor = executor or executors.get_executor()
+    cacheable = [bool(utils.get_files_version(normalize_files(files))) for kind, files in bundle_list]
+    jobs = [(_build_job, (kind, tuple(files)))
+            for (kind, files), is_cacheable in zip(bundle_list, cacheable) if is_cacheable]
+    built = iter(executor.map(executors.call, jobs))
+    results = []
+    for (kind, files), is_cacheable in zip(bundle_list, cacheable):
+        if not is_cacheable:
+            results.append((kind, files, 0.0, 0, NOT_CACHEABLE))
+            continue
+        content, seconds, error = built.next()
+        size = 0
+        if content is not None:
+            _store(bundle_key(kind, files), kind, files, None, content)
+            size = len(content)
+            signals.bundle_built.send(sender=kind, files=normalize_files(files),
+                                      seconds=seconds, size=size)
+        results.append((kind, files, seconds, size, error))
+    return results
+
+def get_stats():
+    """Returns the number of hits and misses of this process as
+    a dictionary with the keys ``'hits'`` and ``'misses'``"""
+    return dict(_stats)
+
+def reset_stats():
+    for name in _stats:
+        _stats[name] = 0
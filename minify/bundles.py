@@ -0,0 +1,144 @@
+"""
+Utility functions to find the bundles (lists of files combined
+into one response) used with the js and css template tags
+"""
+
+import os
+import re
+
+from django.conf import settings
+
+EXTENSIONS = {
+    'js': '.js',
+    'css': '.css',
+}
+
+TAG_RE = re.compile(r"""\{%\s*(js|css)\s+("[^"]*"|'[^']*')(?:\s+("[^"]*"|'[^']*'))?(?:\s+[^%\s]+)?\s*%\}""")
+
+
+def get_files_array(files_in_string, extension):
+    """Utility function to turn the first argument of the js and
+    css template tags into a list of files.
+
+    Params:
+        - ``files_in_string``: either a string of comma separated file
+          paths or the name of a setting holding a list of them
+        - ``extension``: the extension of the files, like ``'.js'``
+
+    Returns:
+        - a tuple of the list of files and a flag if it is grouped,
+          in which case it is a list of lists of files
+    """
+    is_grouped = False
+    if files_in_string.find(extension) == -1:
+        #use a setting
+        files_array = getattr(settings, files_in_string, [])
+        if files_array and isinstance(files_array[0], (list, tuple)):
+            is_grouped = True
+    else:
+        files_in_string = files_in_string.replace(' ','')
+        files_array = files_in_string.split(',')
+    return files_array, is_grouped
+
+def get_file_groups(files_in_string, extension):
+    """Like ``get_files_array``, but always returns a list of
+    groups, each a tuple of files combined into one bundle.
+    """
+    files_array, is_grouped = get_files_array(files_in_string, extension)
+    if not is_grouped:
+        files_array = [files_array]
+    return [tuple([f for f in group if f]) for group in files_array]
+
+def get_template_dirs():
+    """Returns the directories of ``TEMPLATE_DIRS`` and the
+    templates directories of all installed apps.
+    """
+    template_dirs = settings.TEMPLATE_DIRS
+    if isinstance(template_dirs, basestring):
+        template_dirs = [template_dirs]
+    template_dirs = list(template_dirs)
+    try:
+        from django.template.loaders.app_directories import app_template_dirs
+    except ImportError:
+        app_template_dirs = ()
+    for template_dir in app_template_dirs:
+        if template_dir not in template_dirs:
+            template_dirs.append(template_dir)
+    return template_dirs
+
+def find_template_tags(template_dirs=None):
+    """Scans templates for js and css template tags.
+
+    Params:
+        - ``template_dirs`` (optional): the directories to scan,
+          defaults to ``get_template_dirs()``
+
+    Returns:
+        - a list of ``(kind, files_in_string, from_url)`` tuples,
+          ``kind`` being ``'js'`` or ``'css'`` and ``from_url``
+          ``None`` if a js tag has no second argument (the second
+          argument of css tags is the ``inline`` option)
+    """
+    if template_dirs is None:
+        template_dirs = get_template_dirs()
+    tags = []
+    for template_dir in template_dirs:
+        for dirpath, dirnames, filenames in os.walk(template_dir):
+            for filename in filenames:
+                file = open(os.path.join(dirpath, filename), 'r')
+                try:
+                    content = file.read()
+                finally:
+                    file.close()
+                for match in TAG_RE.finditer(content):
+                    from_url = match.group(1) == 'js' and match.group(3) and match.group(3)[1:-1] or None
+                    tags.append((match.group(1), match.group(2)[1:-1], from_url))
+    return tags
+
+def find_setting_names():
+    """Returns the names of settings which look like lists
+    of Javascript or CSS files (or groups of them) used with
+    the js and css template tags, as tuples of the kind and
+    the name of the setting.
+    """
+    names = []
+    for name in dir(settings):
+        if not name.isupper():
+            continue
+        value = getattr(settings, name)
+        if not value or not isinstance(value, (list, tuple)):
+            continue
+        files = []
+        for item in value:
+            if isinstance(item, (list, tuple)):
+                files.extend(item)
+            else:
+                files.append(item)
+        for kind, extension in EXTENSIONS.items():
+            if files and all(isinstance(f, basestring) and f.endswith(extension) for f in files):
+                names.append((kind, name))
+    return names
+
+def find_bundles(template_dirs=None):
+    """Finds all bundles referenced by templates and settings.
+
+    Bundles using a view (``from_url``) are left out, their content
+    can't be known in advance.
+
+    Params:
+        - ``template_dirs`` (optional): the directories to scan,
+          defaults to ``get_template_dirs()``
+
+    Returns:
+        - a list of unique ``(kind, files)`` tuples, ``files`` being
+          a tuple of files combined into one bundle
+    """
+    arguments = [(kind, files_in_string) for kind, files_in_string, from_url
+                 in find_template_tags(template_dirs) if not from_url]
+    arguments.extend(find_setting_names())
+    bundles = []
+    for kind, files_in_string in arguments:
+        for files in get_file_groups(files_in_string, EXTENSIONS[kind]):
+            if files and (kind, files) not in bundles:
+                bundles.append((kind, files))
+    return bundles
@@ -0,0 +1,98 @@
+"""
+Precompressed (gzip and, if the brotli library is installed, brotli)
+variants of minified bundles. Every variant is compressed once per
+bundle version with the highest compression level and kept in Django's
+cache.
+"""
+
+import gzip
+from StringIO import StringIO
+
+from django.core.cache import cache
+
+from minify import app_settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+#in order of preference
+if brotli is not None:
+    ENCODINGS = ('br', 'gzip')
+else:
+    ENCODINGS = ('gzip',)
+
+
+def choose_encoding(accept_encoding):
+    """Chooses the encoding to use for a request.
+
+    Params:
+        - ``accept_encoding``: the value of the request's
+          Accept-Encoding header
+
+    Returns:
+        - ``'br'``, ``'gzip'`` or ``None`` if none of them is accepted
+          (or ``app_settings.MINIFY_PRECOMPRESS`` is off)
+    """
+    if not app_settings.MINIFY_PRECOMPRESS or not accept_encoding:
+        return None
+    accepted = set()
+    for item in accept_encoding.split(','):
+        params = item.strip().split(';')
+        coding = params[0].strip().lower()
+        quality = 1.0
+        for param in params[1:]:
+            name, _, value = param.strip().partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(coding)
+    for encoding in ENCODINGS:
+        if encoding in accepted:
+            return encoding
+    return None
+
+def compress(content, encoding):
+    """Compresses ``content`` with ``encoding``, ``'br'`` or ``'gzip'``"""
+    if isinstance(content, unicode):
+        content = content.encode('utf-8')
+    if encoding == 'br':
+        return brotli.compress(content)
+    buffer = StringIO()
+    file = gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=9, mtime=0)
+    try:
+        file.write(content)
+    finally:
+        file.close()
+    return buffer.getvalue()
+
+def get_compressed(kind, version, encoding, content_func):
+    """Returns a compressed bundle from the cache or compresses
+    and caches it.
+
+    Params:
+        - ``kind``: ``'js'`` or ``'css'``
+        - ``version``: the version of the bundle's files, see
+          ``utils.get_files_version``
+        - ``encoding``: ``'br'`` or ``'gzip'``
+        - ``content_func``: a function without arguments returning
+          the minified content, only called if it's not cached. If
+          it returns ``None`` (the content is not available yet)
+          nothing is compressed
+
+    Returns:
+        - the compressed content or ``None``
+    """
+    key = 'minify:compressed:%s:%s:%s' % (kind, version, encoding)
+    content = cache.get(key)
+    if content is None:
+        content = content_func()
+        if content is None:
+            return None
+        content = compress(content, encoding)
+        cache.set(key, content, app_settings.MINIFY_CACHE_DURATION)
+    return content
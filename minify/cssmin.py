@@ -0,0 +1,134 @@
+"""
+CSS minifier
+
+Scans the stylesheet once, token by token, and writes the minified
+tokens to a list which is joined at the end. Strings, ``url()`` values
+and ``/*! ... */`` comments are copied untouched.
+
+It removes comments, collapses whitespace and drops it next to
+punctuation where it is not needed, drops the semicolons ending a
+block, shortens ``#aabbcc`` colors to ``#abc`` and zero lengths like
+``0px`` to ``0`` within declaration values (except ``flex``, whose
+basis needs its unit in IE 10 and 11).
+"""
+
+import re
+
+from minify.jsmin import output_offsets
+
+# part of the cache keys of minified content, change it whenever the output
+# of cssmin changes
+VERSION = '2'
+
+_TOKEN = re.compile(r"""
+    ((?:\s+|/\*(?!!)[\s\S]*?(?:\*/|\Z))+)      # 1: whitespace and comments
+  | (/\*[\s\S]*?(?:\*/|\Z))                    # 2: /*! preserved comment
+  | ("(?:[^"\\\n]|\\[\s\S])*"
+     |'(?:[^'\\\n]|\\[\s\S])*')                # 3: string
+  | ([uU][rR][lL]\(\s*
+     (?:[^()"'\s\\]|\\[\s\S])*\s*\))           # 4: unquoted url()
+  | (\#[0-9a-fA-F]{6}(?![\w-]))                # 5: six digit color
+  | ((?<![\w.\#-])0+(?:\.0*)?
+     (?:px|em|ex|rem|ch|vw|vh|vmin|vmax
+       |cm|mm|in|pt|pc)(?![\w%-]))             # 6: zero length
+  | ([{};:,>!()])                              # 7: punctuation
+  | ((?:[^\s"'/{}:;,>!()\#\\]|\\[\s\S])+
+     |[\s\S])                                  # 8: anything else
+""", re.VERBOSE)
+
+_SHORT_COLOR = re.compile(r'\#([0-9a-fA-F])\1([0-9a-fA-F])\2([0-9a-fA-F])\3')
+
+# at-rules whose block holds declarations, the block of any other at-rule
+# (@media, @supports, @layer, @container, @scope, ...) holds rules
+_DECLARATIONS_AT_RULE = re.compile(r'''@(?:-\w+-)?(?:
+    font-face|page|viewport|counter-style|property|font-palette-values
+  |(?:top|bottom|left|right)-[\w-]+                     # @page margin boxes
+  |swash|stylistic|styleset|character-variant|ornaments|annotation
+)(?![\w-])''', re.I | re.VERBOSE)
+
+# properties whose zero lengths keep their unit, a unitless flex-basis
+# in the flex shorthand is ignored by IE 10 and 11
+_KEEP_UNITS_PROPERTY = re.compile(r'(?:-\w+-)?flex$', re.I)
+
+_NO_SPACE_AFTER = frozenset('{};:,>(')
+_NO_SPACE_BEFORE = frozenset('{};,>!)')
+
+
+def cssmin(css, mappings=None):
+    """Minify the CSS source ``css`` and return the result.
+
+    If a list is given as ``mappings`` it is filled with an
+    ``(output offset, input offset)`` tuple for every token written,
+    in increasing order, to build a source map from.
+    """
+    chunk_mappings = None
+    if mappings is not None:
+        chunk_mappings = []
+    output = []
+    write = output.append
+    last = ''
+    blocks = []
+    at_rule = None
+    in_value = False
+    keep_units = False
+    property = None
+    parens = 0
+    end = len(css)
+    mark = chunk_mappings is not None and chunk_mappings.append or None
+    for token in _TOKEN.finditer(css):
+        kind = token.lastindex
+        text = token.group(kind)
+        if kind == 1:
+            next = token.end() < end and css[token.end()] or ''
+            in_declarations = blocks and blocks[-1]
+            if (last and next and last not in _NO_SPACE_AFTER
+                    and next not in _NO_SPACE_BEFORE
+                    and not (next == ':' and in_declarations)):
+                write(' ')
+                last = ' '
+            continue
+        if kind == 7:
+            if text == '{':
+                blocks.append(at_rule is None or _DECLARATIONS_AT_RULE.match(at_rule) is not None)
+                at_rule = None
+                in_value = False
+            elif text == '}':
+                while output and output[-1] == ';':
+                    output.pop()
+                    if chunk_mappings and chunk_mappings[-1][0] == len(output):
+                        chunk_mappings.pop()
+                if blocks:
+                    blocks.pop()
+                at_rule = None
+                in_value = False
+            elif text == ';':
+                at_rule = None
+                in_value = False
+            elif text == ':':
+                in_value = bool(blocks and blocks[-1])
+                keep_units = (in_value and property is not None
+                              and _KEEP_UNITS_PROPERTY.match(property) is not None)
+            elif text == '(':
+                parens += 1
+            elif text == ')':
+                parens = max(parens - 1, 0)
+        elif kind == 4:
+            text = '%s(%s)' % (text[:3], text[4:-1].strip())
+        elif kind == 5:
+            if in_value and not parens:
+                text = _SHORT_COLOR.sub(r'#\1\2\3', text)
+        elif kind == 6:
+            if in_value and not parens and not keep_units:
+                text = '0'
+        elif kind == 8:
+            if text[0] == '@' and at_rule is None:
+                at_rule = text
+            if not in_value:
+                property = text
+        if mark is not None:
+            mark((len(output), token.start()))
+        write(text)
+        last = text[-1]
+    if chunk_mappings:
+        mappings.extend(output_offsets(output, chunk_mappings))
+    return ''.join(output)
@@ -0,0 +1,114 @@
+"""
+In memory cache of the content and the minified content of files on
+disk for development (``MINIFY_DEV_CACHE``, on with ``MINIFY_DEBUG``).
+
+A file is only read (and minified) again when its modification time or
+size changed. With ``MINIFY_INDEX_WATCH`` and pyinotify installed the
+files within ``MINIFY_PATHS`` aren't even checked, an inotify watcher
+drops their entries when they change.
+"""
+
+import os
+
+from minify import app_settings
+
+try:
+    import pyinotify
+except ImportError:
+    pyinotify = None
+
+
+class DevCache(object):
+    """Content and minified content of files, by absolute path"""
+
+    def __init__(self):
+        self.entries = {}
+        self.watched_paths = []
+
+    def _is_watched(self, file_path):
+        for path in self.watched_paths:
+            if file_path.startswith(path):
+                return True
+        return False
+
+    def _entry(self, file_path):
+        """Returns the ``(signature, content, minified)`` entry of a file,
+        ``minified`` being a dictionary of the minified content by version.
+        """
+        entry = self.entries.get(file_path)
+        if entry is not None and self._is_watched(file_path):
+            return entry
+        stat = os.stat(file_path)
+        signature = (stat.st_mtime, stat.st_size)
+        if entry is None or entry[0] != signature:
+            file = open(file_path, 'rb')
+            try:
+                entry = (signature, file.read(), {})
+            finally:
+                file.close()
+            self.entries[file_path] = entry
+        return entry
+
+    def read(self, file_path):
+        """Returns the content of the file at ``file_path``"""
+        return self._entry(file_path)[1]
+
+    def minify(self, file_path, minifier, version):
+        """Returns the content of the file at ``file_path`` minified
+        with ``minifier``, ``version`` identifying the minifier."""
+        signature, content, minified = self._entry(file_path)
+        if version not in minified:
+            minified[version] = minifier(content)
+        return minified[version]
+
+    def invalidate(self, file_path=None):
+        """Drops the entry of ``file_path``, or all entries"""
+        if file_path is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(file_path, None)
+
+    def watch(self, paths):
+        """Starts an inotify watcher dropping the entries of files
+        within ``paths`` when they change.
+
+        Returns:
+            - ``True`` if it was started, ``False`` if pyinotify
+              is not available
+        """
+        if pyinotify is None:
+            return False
+        dev_cache = self
+
+        class EventHandler(pyinotify.ProcessEvent):
+            def process_default(self, event):
+                dev_cache.invalidate(event.pathname)
+
+        mask = (pyinotify.IN_CLOSE_WRITE | pyinotify.IN_MODIFY | pyinotify.IN_DELETE |
+                pyinotify.IN_MOVED_FROM | pyinotify.IN_MOVED_TO)
+        manager = pyinotify.WatchManager()
+        notifier = pyinotify.ThreadedNotifier(manager, EventHandler())
+        notifier.daemon = True
+        notifier.start()
+        for path in paths:
+            if os.path.isdir(path):
+                path = os.path.abspath(path)
+                manager.add_watch(path, mask, rec=True, auto_add=True)
+                self.watched_paths.append(path.rstrip(os.sep) + os.sep)
+        return True
+
+
+_dev_cache = None
+
+def get_dev_cache():
+    """Returns the ``DevCache`` of this process or ``None`` if
+    ``app_settings.MINIFY_DEV_CACHE`` is off"""
+    global _dev_cache
+    if not app_settings.MINIFY_DEV_CACHE:
+        return None
+    if _dev_cache is None:
+        dev_cache = DevCache()
+        if app_settings.MINIFY_INDEX_WATCH:
+            dev_cache.watch(app_settings.MINIFY_PATHS)
+        _dev_cache = dev_cache
+    return _dev_cache
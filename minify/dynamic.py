@@ -0,0 +1,109 @@
+"""
+Caching the minified output of views used as the ``url`` of js
+bundles, like i18n catalogs or configuration rendered as Javascript.
+Views opt in with the ``cacheable`` decorator:
+
+    @dynamic.cacheable(timeout=60 * 60, key=lambda request: request.LANGUAGE_CODE)
+    def catalog(request):
+        ...
+
+A bundle combining files with such a view caches the output of the
+view and the minified files separately, so a new output of the view
+doesn't minify the files again.
+"""
+
+import hashlib
+
+from django import http
+from django.core import urlresolvers
+from django.core.cache import cache
+from django.utils.encoding import smart_str
+
+from minify import app_settings
+
+KEY_PREFIX = 'minify:view'
+
+
+def cacheable(timeout=None, key=None, version=None):
+    """Decorator letting the minify views cache the minified output
+    of a view.
+
+    Params:
+        - ``timeout`` (optional): how long the output is cached in
+          seconds, defaults to ``app_settings.MINIFY_CACHE_DURATION``
+        - ``key`` (optional): a function called with the request
+          returning a string the output depends on besides its url
+          (like the language)
+        - ``version`` (optional): a function called with the request
+          returning the version of the output, which is cached until
+          the version changes
+
+    Returns:
+        - the decorator
+    """
+    def decorator(view):
+        view.minify_cacheable = (timeout, key, version)
+        return view
+    return decorator
+
+def get_options(view):
+    """Returns the ``(timeout, key, version)`` tuple of a view
+    decorated with ``cacheable`` or ``None``"""
+    return getattr(view, 'minify_cacheable', None)
+
+def is_cacheable(url):
+    """Returns ``True`` if the view ``url`` resolves to is decorated
+    with ``cacheable``"""
+    try:
+        view, args, kwargs = urlresolvers.resolve(url.split('?')[0])
+    except http.Http404:
+        return False
+    return get_options(view) is not None
+
+def cache_key(request, url, options):
+    """Build the cache key of the minified output of a view
+
+    Params:
+        - ``request``: the ``django.http.HttpRequest`` the view is called
+          with, its query parameters are part of the key
+        - ``url``: the url of the view, with its query string
+        - ``options``: the options of the view, see ``get_options``
+
+    Returns:
+        - the cache key
+    """
+    timeout, key, version = options
+    #the view gets the parameters of the minify request as well
+    parts = [smart_str(url)]
+    for name, values in sorted(request.GET.lists()):
+        parts.append('%s=%s' % (smart_str(name), ','.join([smart_str(value) for value in values])))
+    #key and version may return numbers or unicode
+    if key is not None:
+        parts.append(smart_str(key(request)))
+    if version is not None:
+        parts.append(smart_str(version(request)))
+    return '%s:%s' % (KEY_PREFIX, hashlib.sha1('\n'.join(parts)).hexdigest())
+
+def get_minified(request, view, url, build_func):
+    """Returns the minified output of a view from the cache if the
+    view is decorated with ``cacheable``, otherwise builds it.
+
+    Params:
+        - ``request``: the ``django.http.HttpRequest`` the view is called with
+        - ``view``: the view function
+        - ``url``: the url of the view, with its query string
+        - ``build_func``: a function without arguments calling the view
+          and returning its minified output
+
+    Returns:
+        - the minified output
+    """
+    options = get_options(view)
+    if options is None:
+        return build_func()
+    key = cache_key(request, url, options)
+    content = cache.get(key)
+    if content is None:
+        content = build_func()
+        cache.set(key, content, options[0] or app_settings.MINIFY_CACHE_DURATION)
+    return content
@@ -0,0 +1,135 @@
+"""
+Executors running the minification of several files, serially or
+concurrently in a pool of processes. The executor is chosen by the
+``MINIFY_EXECUTOR`` setting:
+
+- ``'serial'``: minify one file after the other in the current process
+- ``'process'``: minify in a pool of ``MINIFY_WORKERS`` processes
+- the dotted path of a class with a ``map(function, items)`` method
+
+Remote sources are fetched concurrently in a pool of
+``MINIFY_FETCH_THREADS`` threads, see ``get_fetch_executor``.
+"""
+
+import os
+
+from django.utils.importlib import import_module
+
+from minify import app_settings
+
+
+def call(args):
+    """Calls ``function(argument)`` for an ``(function, argument)``
+    tuple, so a list of different functions and arguments can be
+    passed to ``map`` at once. ``function`` has to be picklable
+    (defined at module level) for a process pool.
+    """
+    function, argument = args
+    return function(argument)
+
+
+class SerialExecutor(object):
+    """Runs everything in the current process"""
+
+    def map(self, function, items):
+        return [function(item) for item in items]
+
+
+class ProcessPoolExecutor(object):
+    """Runs ``function`` in a pool of ``workers`` processes,
+    which is started with the first call of ``map``. If it can't
+    be started everything runs in the current process.
+    """
+
+    def __init__(self, workers=None):
+        #multiprocessing is imported by the processes using a pool only
+        import multiprocessing
+        self.workers = workers or multiprocessing.cpu_count()
+        self.pool = None
+
+    def map(self, function, items):
+        items = list(items)
+        if len(items) < 2 or self.workers < 2:
+            return SerialExecutor().map(function, items)
+        if self.pool is None:
+            try:
+                import multiprocessing
+                self.pool = multiprocessing.Pool(self.workers)
+            except (OSError, ImportError):
+                self.workers = 1
+                return SerialExecutor().map(function, items)
+        return self.pool.map(function, items)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+
+class ThreadPoolExecutor(object):
+    """Runs ``function`` in a pool of ``workers`` threads, for work
+    waiting on I/O. The pool is started with the first call and again
+    in a forked process, which doesn't inherit its threads.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.pool = None
+        self.pid = None
+
+    def _get_pool(self):
+        if self.pool is None or self.pid != os.getpid():
+            from multiprocessing import pool as multiprocessing_pool
+            self.pool = multiprocessing_pool.ThreadPool(self.workers)
+            self.pid = os.getpid()
+        return self.pool
+
+    def map(self, function, items):
+        items = list(items)
+        if len(items) < 2 or self.workers < 2:
+            return SerialExecutor().map(function, items)
+        return self._get_pool().map(function, items)
+
+    def submit(self, function, *args):
+        """Starts ``function(*args)`` in the pool and returns an object
+        whose ``get()`` method waits for its result (or exception)"""
+        return self._get_pool().apply_async(function, args)
+
+    def close(self):
+        if self.pool is not None and self.pid == os.getpid():
+            self.pool.close()
+            self.pool.join()
+        self.pool = None
+
+
+_executor = None
+
+def get_executor():
+    """Returns the executor configured by ``MINIFY_EXECUTOR``,
+    created once per process.
+    """
+    global _executor
+    if _executor is None:
+        name = app_settings.MINIFY_EXECUTOR
+        if name == 'serial':
+            _executor = SerialExecutor()
+        elif name == 'process':
+            _executor = ProcessPoolExecutor(app_settings.MINIFY_WORKERS)
+        else:
+            module_name, class_name = name.rsplit('.', 1)
+            _executor = getattr(import_module(module_name), class_name)()
+    return _executor
+
+_fetch_executor = None
+
+def get_fetch_executor():
+    """Returns the pool of ``MINIFY_FETCH_THREADS`` threads fetching
+    remote sources, or ``None`` if they are fetched one after the other.
+    """
+    global _fetch_executor
+    if app_settings.MINIFY_FETCH_THREADS < 2:
+        return None
+    if _fetch_executor is None:
+        _fetch_executor = ThreadPoolExecutor(app_settings.MINIFY_FETCH_THREADS)
+    return _fetch_executor
@@ -0,0 +1,120 @@
+"""
+Fetching remote sources (``http://`` or ``https://`` urls) to minify
+
+Connections are kept open and reused per thread and host, every request
+is bounded by ``MINIFY_FETCH_TIMEOUT``. Fetched content is kept in Django's
+cache together with its ``ETag`` and ``Last-Modified`` headers, so the next
+fetch is a conditional GET which mostly ends with a ``304 Not Modified``.
+"""
+
+import hashlib
+import httplib
+import socket
+import threading
+import urlparse
+
+from django.core.cache import cache
+
+from minify import app_settings
+
+MAX_REDIRECTS = 3
+
+
+class FetchError(Exception):
+    pass
+
+
+class RemoteFetcher(object):
+    """Fetches urls over pooled keep-alive connections"""
+
+    def __init__(self, timeout=app_settings.MINIFY_FETCH_TIMEOUT,
+                 cache_timeout=app_settings.MINIFY_CACHE_DURATION):
+        self.timeout = timeout
+        self.cache_timeout = cache_timeout
+        self.local = threading.local()
+
+    def _connection(self, scheme, netloc, new=False):
+        connections = getattr(self.local, 'connections', None)
+        if connections is None:
+            connections = self.local.connections = {}
+        key = (scheme, netloc)
+        if new and key in connections:
+            connections.pop(key).close()
+        if key not in connections:
+            if scheme == 'https':
+                connection_class = httplib.HTTPSConnection
+            else:
+                connection_class = httplib.HTTPConnection
+            connections[key] = connection_class(netloc, timeout=self.timeout)
+        return connections[key]
+
+    def _request(self, url, headers):
+        """Sends a GET request, retrying once on a new connection if
+        the kept alive connection was closed by the server.
+
+        Returns:
+            - a tuple of the status, the ``httplib.HTTPResponse`` and its body
+        """
+        scheme, netloc, path, query, fragment = urlparse.urlsplit(url)
+        if query:
+            path = '%s?%s' % (path, query)
+        for attempt in (0, 1):
+            connection = self._connection(scheme, netloc, new=attempt > 0)
+            try:
+                connection.request('GET', path or '/', headers=headers)
+                response = connection.getresponse()
+                return response.status, response, response.read()
+            except (httplib.HTTPException, socket.error), e:
+                connection.close()
+                if attempt > 0 or isinstance(e, socket.timeout):
+                    raise FetchError('Could not fetch %s: %s' % (url, e))
+
+    def _cache_key(self, url):
+        return 'minify:fetch:%s' % hashlib.sha1(url).hexdigest()
+
+    def fetch(self, url):
+        """Returns the content of ``url``. If it can't be fetched
+        the last fetched content is returned, if there is none
+        ``FetchError`` is raised.
+        """
+        cache_key = self._cache_key(url)
+        cached = cache.get(cache_key)
+        headers = {}
+        if cached is not None:
+            etag, last_modified, content = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        location = url
+        try:
+            for redirect in range(MAX_REDIRECTS + 1):
+                status, response, body = self._request(location, headers)
+                if status in (301, 302, 303, 307) and response.getheader('location'):
+                    location = urlparse.urljoin(location, response.getheader('location'))
+                    continue
+                break
+        except FetchError:
+            if cached is not None:
+                return cached[2]
+            raise
+        if status == 304 and cached is not None:
+            return cached[2]
+        if status != 200:
+            if cached is not None:
+                return cached[2]
+            raise FetchError('Could not fetch %s: status %s' % (url, status))
+        cache.set(cache_key, (response.getheader('etag'),
+                              response.getheader('last-modified'), body),
+                  self.cache_timeout)
+        return body
+
+
+_fetcher = None
+
+def get_fetcher():
+    """Returns the ``RemoteFetcher`` of this process"""
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = RemoteFetcher()
+    return _fetcher
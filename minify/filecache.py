@@ -0,0 +1,266 @@
+"""
+Content addressed cache for the minified content of single files,
+so a bundle only has to minify the files which were never minified
+before (or changed since).
+
+Keys are built from the minifier version and a SHA-1 hash of the
+not minified content. The backend is chosen by the
+``MINIFY_FILE_CACHE`` setting:
+
+- ``'django'``: Django's cache framework, eviction is left to the
+  configured cache backend
+- ``'disk'``: files within ``MINIFY_FILE_CACHE_DIR``, least recently
+  used files are removed when ``MINIFY_FILE_CACHE_MAX_SIZE`` is exceeded
+- ``None``: no caching at all
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from minify import app_settings
+from minify import executors
+
+KEY_PREFIX = 'minify'
+
+
+def make_key(content, version):
+    """Build the cache key for the minified version of ``content``
+
+    Params:
+        - ``content``: the not minified content of a file
+        - ``version``: identifies the minifier and its version
+          (like ``'jsmin-1'``)
+
+    Returns:
+        - the cache key
+    """
+    if isinstance(content, unicode):
+        content = content.encode('utf-8')
+    return '%s:%s:%s' % (KEY_PREFIX, version, hashlib.sha1(content).hexdigest())
+
+
+class BaseFileCache(object):
+    """Interface of file caches"""
+
+    def get(self, key):
+        """Returns the cached content for ``key`` or ``None``"""
+        raise NotImplementedError
+
+    def set(self, key, content):
+        """Stores ``content`` under ``key``"""
+        raise NotImplementedError
+
+
+class DjangoFileCache(BaseFileCache):
+    """File cache using Django's cache framework"""
+
+    def __init__(self, timeout=app_settings.MINIFY_CACHE_DURATION):
+        from django.core.cache import cache
+        self.cache = cache
+        self.timeout = timeout
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, content):
+        self.cache.set(key, content, self.timeout)
+
+
+class DiskFileCache(BaseFileCache):
+    """File cache storing one file per key within ``directory``,
+    bounded by ``max_size`` bytes.
+
+    Every hit updates the modification time of the file, so evicting
+    the files with the oldest modification time first removes the
+    least recently used ones.
+    """
+
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+        self.size = None
+        self.lock = threading.Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key.replace(':', '-'))
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            file = open(path, 'rb')
+        except IOError:
+            return None
+        try:
+            content = file.read()
+        finally:
+            file.close()
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return content
+
+    def set(self, key, content):
+        if isinstance(content, unicode):
+            content = content.encode('utf-8')
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp')
+        try:
+            os.write(fd, content)
+        finally:
+            os.close(fd)
+        os.rename(temp_path, self._path(key))
+        self.lock.acquire()
+        try:
+            if self.size is None:
+                self.size = sum(size for path, mtime, size in self._entries())
+            else:
+                self.size += len(content)
+            if self.size > self.max_size:
+                self._evict()
+        finally:
+            self.lock.release()
+
+    def _entries(self):
+        entries = []
+        for filename in os.listdir(self.directory):
+            if filename.startswith('.tmp'):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def _evict(self):
+        """Removes the least recently used files until the cache
+        is filled to 90% of its maximum size"""
+        entries = self._entries()
+        entries.sort(key=lambda entry: entry[1])
+        self.size = sum(size for path, mtime, size in entries)
+        limit = self.max_size * 0.9
+        for path, mtime, size in entries:
+            if self.size <= limit:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.size -= size
+
+
+_file_cache = None
+
+def get_file_cache():
+    """Returns the file cache configured by ``MINIFY_FILE_CACHE``
+    or ``None`` if caching is disabled.
+    """
+    global _file_cache
+    if _file_cache is None:
+        backend = app_settings.MINIFY_FILE_CACHE
+        if backend == 'django':
+            _file_cache = DjangoFileCache()
+        elif backend == 'disk':
+            _file_cache = DiskFileCache(app_settings.MINIFY_FILE_CACHE_DIR,
+                                        app_settings.MINIFY_FILE_CACHE_MAX_SIZE)
+        elif backend:
+            raise ValueError('Unknown MINIFY_FILE_CACHE backend %r' % backend)
+    return _file_cache
+
+def cached_minify(content, minifier, version):
+    """Minifies ``content`` with ``minifier`` unless its minified
+    version is in the file cache already.
+
+    Params:
+        - ``content``: the content to minify
+        - ``minifier``: the function which is used to minify the content
+        - ``version``: identifies the minifier and its version, if it is
+          ``None`` the content is not cached
+
+    Returns:
+        - the minified content
+    """
+    file_cache = get_file_cache()
+    if file_cache is None or version is None or not content:
+        return minifier(content)
+    key = make_key(content, version)
+    minified = file_cache.get(key)
+    if minified is None:
+        minified = minifier(content)
+        file_cache.set(key, minified)
+    return minified
+
+def _timed_minify(job):
+    """Minifies the content of a ``(minifier, content)`` tuple,
+    returning the minified content and the seconds it took"""
+    minifier, content = job
+    start = time.time()
+    return minifier(content), time.time() - start
+
+def cached_minify_many(items, executor=None, timings=None):
+    """Like ``cached_minify`` for a list of contents, minifying the
+    contents which are not cached yet with ``executor``. Contents
+    which are the same are minified only once.
+
+    Contents can be memory mapped files (see ``utils.read_from_file``),
+    they are only copied into strings if they are passed to an
+    executor other than ``executors.SerialExecutor``, which might
+    have to pickle them.
+
+    Params:
+        - ``items``: a list of ``(content, minifier, version)`` tuples
+        - ``executor`` (optional): an executor from ``minify.executors``,
+          defaults to running everything in the current process
+        - ``timings`` (optional): a list filled with a ``(seconds, cached)``
+          tuple per item, the seconds the minifier took and a flag if
+          the content was cached (or minified for an earlier item)
+
+    Returns:
+        - a list of the minified contents in the order of ``items``
+    """
+    if executor is None:
+        executor = executors.SerialExecutor()
+    file_cache = get_file_cache()
+    results = [None] * len(items)
+    seconds = [0.0] * len(items)
+    cached = [True] * len(items)
+    missing = {}
+    jobs = []
+    for index, (content, minifier, version) in enumerate(items):
+        if not content:
+            results[index] = minifier(content)
+            cached[index] = False
+            continue
+        key = None
+        if file_cache is not None and version is not None:
+            key = make_key(content, version)
+            results[index] = file_cache.get(key)
+            if results[index] is not None:
+                continue
+        job_key = (minifier, key or make_key(content, None))
+        if job_key not in missing:
+            if not isinstance(content, basestring) and \
+                    not isinstance(executor, executors.SerialExecutor):
+                content = content[:]
+            missing[job_key] = (key, [])
+            jobs.append((job_key, (_timed_minify, (minifier, content))))
+        missing[job_key][1].append(index)
+    if jobs:
+        minified_contents = executor.map(executors.call, [job for job_key, job in jobs])
+        for (job_key, job), (minified, job_seconds) in zip(jobs, minified_contents):
+            key, indexes = missing[job_key]
+            if key is not None:
+                file_cache.set(key, minified)
+            seconds[indexes[0]] = job_seconds
+            cached[indexes[0]] = False
+            for index in indexes:
+                results[index] = minified
+    if timings is not None:
+        timings.extend(zip(seconds, cached))
+    return results
@@ -0,0 +1,146 @@
+"""
+Index of all files within ``MINIFY_PATHS``, mapping their relative
+paths to absolute paths, so looking up a file doesn't need any stat
+calls.
+
+The index is built on first use. It is rebuilt when the modification
+time of one of the indexed directories changed (files were added,
+removed or renamed), which is checked at most every
+``MINIFY_INDEX_CHECK_INTERVAL`` seconds. With ``MINIFY_INDEX_WATCH``
+and pyinotify installed, changes are picked up by an inotify watcher
+instead.
+"""
+
+import os
+import threading
+import time
+
+from minify import app_settings
+
+try:
+    import pyinotify
+except ImportError:
+    pyinotify = None
+
+
+class FileIndex(object):
+    """Index of the files within ``paths``. If a relative path exists
+    in several of them, the first one wins like it does for
+    ``utils.find_in_path``.
+    """
+
+    def __init__(self, paths, check_interval=app_settings.MINIFY_INDEX_CHECK_INTERVAL):
+        self.paths = list(paths)
+        self.check_interval = check_interval
+        self.files = None
+        self.directories = {}
+        self.checked = 0
+        self.watched = False
+        self.lock = threading.Lock()
+
+    def _build(self):
+        files = {}
+        directories = {}
+        for path in self.paths:
+            try:
+                directories[path] = os.stat(path).st_mtime
+            except OSError:
+                directories[path] = None
+                continue
+            for dirpath, dirnames, filenames in os.walk(path, followlinks=True):
+                if dirpath != path:
+                    directories[dirpath] = os.stat(dirpath).st_mtime
+                relative_dir = os.path.relpath(dirpath, path)
+                for filename in filenames:
+                    if relative_dir == os.curdir:
+                        relative_path = filename
+                    else:
+                        relative_path = os.path.join(relative_dir, filename)
+                    files.setdefault(relative_path, os.path.join(dirpath, filename))
+        self.directories = directories
+        self.files = files
+        self.checked = time.time()
+
+    def _is_stale(self):
+        for directory, mtime in self.directories.iteritems():
+            try:
+                if os.stat(directory).st_mtime != mtime:
+                    return True
+            except OSError:
+                if mtime is not None:
+                    return True
+        return False
+
+    def _get_files(self):
+        files = self.files
+        if files is not None and (self.watched or
+                time.time() - self.checked < self.check_interval):
+            return files
+        self.lock.acquire()
+        try:
+            if self.files is None or (not self.watched and self._is_stale()):
+                self._build()
+            else:
+                self.checked = time.time()
+            return self.files
+        finally:
+            self.lock.release()
+
+    def invalidate(self):
+        """Makes the next lookup rebuild the index"""
+        self.files = None
+
+    def lookup(self, filename):
+        """Returns the absolute path of ``filename``, a relative path
+        within one of the indexed paths, or ``None`` if it doesn't exist.
+        """
+        return self._get_files().get(os.path.normpath(filename))
+
+    def list(self, extension=None):
+        """Returns the sorted relative paths of all indexed files,
+        optionally only those ending with ``extension``.
+        """
+        files = self._get_files()
+        if extension is None:
+            return sorted(files)
+        return sorted([f for f in files if f.endswith(extension)])
+
+    def watch(self):
+        """Starts an inotify watcher invalidating the index on changes.
+
+        Returns:
+            - ``True`` if it was started, ``False`` if pyinotify
+              is not available
+        """
+        if pyinotify is None:
+            return False
+        index = self
+
+        class EventHandler(pyinotify.ProcessEvent):
+            def process_default(self, event):
+                index.invalidate()
+
+        mask = (pyinotify.IN_CREATE | pyinotify.IN_DELETE | pyinotify.IN_MOVED_FROM |
+                pyinotify.IN_MOVED_TO | pyinotify.IN_DELETE_SELF)
+        manager = pyinotify.WatchManager()
+        notifier = pyinotify.ThreadedNotifier(manager, EventHandler())
+        notifier.daemon = True
+        notifier.start()
+        for path in self.paths:
+            if os.path.isdir(path):
+                manager.add_watch(path, mask, rec=True, auto_add=True)
+        self.watched = True
+        return True
+
+
+_file_index = None
+
+def get_file_index():
+    """Returns the index of ``app_settings.MINIFY_PATHS``"""
+    global _file_index
+    if _file_index is None:
+        file_index = FileIndex(app_settings.MINIFY_PATHS)
+        if app_settings.MINIFY_INDEX_WATCH:
+            file_index.watch()
+        _file_index = file_index
+    return _file_index
@@ -0,0 +1,129 @@
+"""
+Receivers of the signals of ``minify.signals``, chosen by the
+``MINIFY_INSTRUMENTATION`` setting, a list of:
+
+- ``'log'``: log every signal to the ``'minify'`` logger (debug level)
+- ``'counters'``: add them up per signal in ``counters``
+- the dotted path of a function connecting receivers itself
+"""
+
+import logging
+import threading
+
+from django.utils.importlib import import_module
+
+from minify import app_settings
+from minify import signals
+
+logger = logging.getLogger('minify')
+
+
+def log_file_read(sender, filename, source, seconds, size, **kwargs):
+    logger.debug('read %s from %s in %.1f ms, %d bytes',
+                 filename, source, seconds * 1000, size)
+
+def log_file_minified(sender, filename, version, seconds, size, minified_size, cached, **kwargs):
+    logger.debug('minified %s with %s in %.1f ms%s, %s -> %d bytes',
+                 filename, version, seconds * 1000, cached and ' (cached)' or '',
+                 size is None and '?' or size, minified_size)
+
+def log_bundle_built(sender, files, seconds, size, **kwargs):
+    logger.debug('built %s bundle %s in %.1f ms, %d bytes',
+                 sender, ','.join(files), seconds * 1000, size)
+
+def log_bundle_served(sender, files, seconds, size, cached, encoding, **kwargs):
+    logger.debug('served %s bundle %s in %.1f ms%s, %s%s',
+                 sender, ','.join(files), seconds * 1000, cached and ' (cached)' or '',
+                 size is None and 'streamed' or '%d bytes' % size,
+                 encoding and ' (%s)' % encoding or '')
+
+def connect_logging():
+    """Logs every signal to the ``'minify'`` logger"""
+    signals.file_read.connect(log_file_read, dispatch_uid='minify.log_file_read')
+    signals.file_minified.connect(log_file_minified, dispatch_uid='minify.log_file_minified')
+    signals.bundle_built.connect(log_bundle_built, dispatch_uid='minify.log_bundle_built')
+    signals.bundle_served.connect(log_bundle_served, dispatch_uid='minify.log_bundle_served')
+
+
+class Counters(object):
+    """Totals of the signals of this process, by signal name: how often
+    they were sent, their seconds and sizes and how often the content
+    was cached (hits) or not (misses).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = {}
+
+    def add(self, name, seconds=0, size=0, minified_size=0, cached=None):
+        self.lock.acquire()
+        try:
+            totals = self.totals.setdefault(name, {
+                'count': 0, 'seconds': 0.0, 'size': 0, 'minified_size': 0,
+                'hits': 0, 'misses': 0,
+            })
+            totals['count'] += 1
+            totals['seconds'] += seconds
+            totals['size'] += size or 0
+            totals['minified_size'] += minified_size or 0
+            if cached is not None:
+                totals[cached and 'hits' or 'misses'] += 1
+        finally:
+            self.lock.release()
+
+    def get(self):
+        """Returns a copy of the totals"""
+        self.lock.acquire()
+        try:
+            return dict((name, dict(totals)) for name, totals in self.totals.items())
+        finally:
+            self.lock.release()
+
+    def reset(self):
+        self.lock.acquire()
+        try:
+            self.totals = {}
+        finally:
+            self.lock.release()
+
+    def file_read(self, sender, seconds, size, **kwargs):
+        self.add('file_read', seconds, size)
+
+    def file_minified(self, sender, seconds, size, minified_size, cached, **kwargs):
+        self.add('file_minified', seconds, size, minified_size, cached)
+
+    def bundle_built(self, sender, seconds, size, **kwargs):
+        self.add('bundle_built', seconds, size)
+
+    def bundle_served(self, sender, seconds, size, cached, **kwargs):
+        self.add('bundle_served', seconds, size, cached=cached)
+
+    def connect(self):
+        for name in ('file_read', 'file_minified', 'bundle_built', 'bundle_served'):
+            getattr(signals, name).connect(getattr(self, name), weak=False,
+                                           dispatch_uid='minify.counters.%s' % name)
+
+    def disconnect(self):
+        for name in ('file_read', 'file_minified', 'bundle_built', 'bundle_served'):
+            getattr(signals, name).disconnect(dispatch_uid='minify.counters.%s' % name)
+
+
+counters = Counters()
+
+_installed = False
+
+def install():
+    """Connects the receivers configured by ``MINIFY_INSTRUMENTATION``,
+    once per process."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    for name in app_settings.MINIFY_INSTRUMENTATION:
+        if name == 'log':
+            connect_logging()
+        elif name == 'counters':
+            counters.connect()
+        else:
+            module_name, function_name = name.rsplit('.', 1)
+            getattr(import_module(module_name), function_name)()
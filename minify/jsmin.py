@@ -30,17 +30,160 @@
 # SOFTWARE.
 # */
 
-from StringIO import StringIO
+#
+# The ``jsmin`` function below is a rewrite of the same algorithm which scans
+# the whole buffer with compiled regular expressions instead of pulling one
+# character at a time out of a stream. Its output is byte-identical to the
+# original ``JavascriptMinify`` state machine, which is kept in this module as
+# the reference implementation (and for code using the stream interface).
+
+import re
+
+# part of the cache keys of minified content, change it whenever the output
+# of jsmin changes
+VERSION = '1'
+
+# control characters are turned into spaces (carriage returns into linefeeds)
+# before anything else happens, exactly like ``JavascriptMinify._get`` does
+_CARRIAGE_RETURN = re.compile(r'\r')
+_CONTROL_CHARS = re.compile(r'[\x00-\x09\x0b-\x1f]')
+
+# top level tokens, dispatched on ``match.lastindex``
+_TOKEN = re.compile(r"""
+    ([^ \n/"']+)                          # 1: run of plain characters
+  | ([ \n]+)                              # 2: run of whitespace
+  | (//[^\n]*)                            # 3: line comment
+  | (/\*[\s\S]*?\*/)                      # 4: block comment
+  | ("(?:[^"\\\n]|\\[\s\S])*"
+     |'(?:[^'\\\n]|\\[\s\S])*')           # 5: string literal
+  | (/\*)                                 # 6: unterminated comment
+  | (["'])                                # 7: unterminated string literal
+  | (/)                                   # 8: slash (division or regexp)
+""", re.VERBOSE)
+
+_REGEXP = re.compile(r'/(?:[^/\\\n]|\\[\s\S])*/')
+
+_ALPHANUM = frozenset('abcdefghijklmnopqrstuvwxyz'
+                      'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+                      '0123456789_$\\')
+# characters keeping a following linefeed
+_KEEP_NEWLINE_AFTER = frozenset('}])+-"\'')
+# characters keeping a preceding linefeed
+_KEEP_NEWLINE_BEFORE = frozenset('{[(+-')
+# characters after which a slash starts a regular expression
+_REGEXP_AFTER = frozenset('(,=:[?!&|;{}\n')
+
+
+def jsmin(js, mappings=None):
+    """Minify the Javascript source ``js`` and return the result.
 
-def jsmin(js):
-    ins = StringIO(js)
-    outs = StringIO()
-    JavascriptMinify().minify(ins, outs)
-    str = outs.getvalue()
+    If a list is given as ``mappings`` it is filled with an
+    ``(output offset, input offset)`` tuple for every token written,
+    in increasing order, to build a source map from.
+    """
+    chunk_mappings = None
+    if mappings is not None:
+        chunk_mappings = []
+    output = _minify(js, chunk_mappings)
+    str = ''.join(output)
+    offset = 0
     if len(str) > 0 and str[0] == '\n':
         str = str[1:]
+        offset = -1
+    if chunk_mappings:
+        mappings.extend(output_offsets(output, chunk_mappings, offset))
     return str
 
+def output_offsets(output, chunk_mappings, offset=0):
+    """Turns ``(chunk index, input offset)`` tuples into ``(output offset,
+    input offset)`` tuples, ``output`` being the list of chunks joined to
+    the output and ``offset`` added to all output offsets. Of several
+    tuples with the same output offset only the last one is kept."""
+    mappings = []
+    index = 0
+    end = len(output)
+    for chunk_index, input_offset in chunk_mappings:
+        if chunk_index >= end:
+            break
+        while index < chunk_index:
+            offset += len(output[index])
+            index += 1
+        if mappings and mappings[-1][0] == offset:
+            mappings[-1] = (offset, input_offset)
+        else:
+            mappings.append((offset, input_offset))
+    return mappings
+
+def _minify(js, chunk_mappings=None):
+    """Run the jsmin algorithm over the whole string ``js``.
+
+    Non-whitespace tokens are copied verbatim, only the whitespace (and
+    comments) between them has to be decided on. ``last`` is the last
+    character written, ``pending`` the whitespace character which might be
+    written before the next token, or ``''`` if there is none.
+
+    ``js`` can be any object supporting the buffer interface (like a
+    memory mapped file), the substitution of the control characters is
+    the only copy of it which is made.
+
+    Returns the list of output chunks. If ``chunk_mappings`` is a list
+    it is filled with a ``(chunk index, input offset)`` tuple per token.
+    """
+    if _CARRIAGE_RETURN.search(js) is not None:
+        js = _CARRIAGE_RETURN.sub('\n', js)
+    js = _CONTROL_CHARS.sub(' ', js)
+    output = []
+    write = output.append
+    last = '\n'
+    pending = '\n'
+    pos = 0
+    end = len(js)
+    match = _TOKEN.match
+    mark = chunk_mappings is not None and chunk_mappings.append or None
+    while pos < end:
+        start = pos
+        token = match(js, pos)
+        kind = token.lastindex
+        pos = token.end()
+        if kind == 2 or kind == 4:
+            # a block comment counts as a single space
+            newline = kind == 2 and '\n' in token.group(2)
+            if pending:
+                if newline:
+                    pending = '\n'
+            elif last in _ALPHANUM or last > '~':
+                pending = newline and '\n' or ' '
+            elif newline and last in _KEEP_NEWLINE_AFTER:
+                pending = '\n'
+            continue
+        if kind == 3:
+            continue
+        if kind == 6:
+            raise UnterminatedComment()
+        if kind == 7:
+            raise UnterminatedStringLiteral()
+        text = token.group(kind)
+        if kind == 8 and (pending or last) in _REGEXP_AFTER:
+            regexp = _REGEXP.match(js, pos - 1)
+            if regexp is None:
+                raise UnterminatedRegularExpression()
+            if pending:
+                write(pending)
+            text = regexp.group()
+            pos = regexp.end()
+        elif pending:
+            first = text[0]
+            if first in _ALPHANUM or first > '~' or (
+                    pending == '\n' and first in _KEEP_NEWLINE_BEFORE):
+                write(pending)
+        if mark is not None:
+            mark((len(output), start))
+        write(text)
+        last = text[-1]
+        pending = ''
+    return output
+
+
 def isAlphanum(c):
     """return true if the character is a letter, digit, underscore,
            dollar sign, or non-ASCII character.
@@ -58,6 +201,10 @@ class UnterminatedRegularExpression(Exception):
     pass
 
 class JavascriptMinify(object):
+    """The original character at a time jsmin state machine, reading from
+    and writing to file like objects. ``jsmin`` produces the same output
+    without going through a stream.
+    """
 
     def _outA(self):
         self.outstream.write(self.theA)
@@ -0,0 +1,49 @@
+"""
+Management command minifying all bundles used by the js and css
+template tags into content hashed files
+"""
+
+import sys
+from optparse import make_option
+
+from django.core.management.base import NoArgsCommand
+
+from minify import app_settings
+from minify import build
+from minify import executors
+from minify import splitting
+
+
+class Command(NoArgsCommand):
+    help = ('Minifies all bundles referenced by js and css template tags '
+            'into content hashed files and writes a manifest which lets '
+            'the template tags point to them.')
+    option_list = NoArgsCommand.option_list + (
+        make_option('--build-root', dest='build_root',
+            default=app_settings.MINIFY_BUILD_ROOT,
+            help='Directory to write the bundles to (default: MINIFY_BUILD_ROOT).'),
+        make_option('--workers', dest='workers', type='int', default=None,
+            help='Number of processes minifying files (default: MINIFY_EXECUTOR).'),
+    )
+
+    def handle_noargs(self, **options):
+        verbosity = int(options.get('verbosity', 1))
+        build_root = options['build_root']
+        executor = None
+        if options['workers']:
+            executor = executors.ProcessPoolExecutor(options['workers'])
+        bundle_list = splitting.find_served_bundles()
+        try:
+            manifest, errors = build.build_bundles(bundle_list, build_root, executor)
+        finally:
+            if executor is not None:
+                executor.close()
+        for kind, files, error in errors:
+            sys.stderr.write('Could not build %s bundle %s: %s\n' % (
+                kind, build.bundle_key(files), error))
+        if verbosity > 1:
+            for key, filename in sorted(manifest.items()):
+                self.stdout.write('%s -> %s\n' % (key, filename))
+        if verbosity > 0:
+            self.stdout.write('Built %d of %d bundles into %s\n' % (
+                len(manifest), len(bundle_list), build_root))
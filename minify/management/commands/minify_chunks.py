@@ -0,0 +1,48 @@
+"""
+Management command showing how the bundles used by the js and css
+template tags are split into shared chunks (``MINIFY_SPLIT_BUNDLES``)
+"""
+
+import os
+
+from django.core.management.base import NoArgsCommand
+
+from minify import bundles
+from minify import splitting
+from minify import utils
+
+
+def _size(files):
+    """Returns the size in bytes of the files on disk of a chunk"""
+    size = 0
+    for filename in files:
+        file_path = utils.get_file_path(filename)
+        if file_path is not None:
+            size += os.path.getsize(file_path)
+    return size
+
+
+class Command(NoArgsCommand):
+    help = ('Shows the chunks shared between the bundles referenced by js '
+            'and css template tags, which the tags point to with '
+            'MINIFY_SPLIT_BUNDLES.')
+
+    def handle_noargs(self, **options):
+        bundle_list = bundles.find_bundles()
+        plan = splitting.split_bundles(bundle_list)
+        shared = {}
+        for kind, files in bundle_list:
+            for chunk in plan[(kind, files)]:
+                shared[(kind, chunk)] = shared.get((kind, chunk), 0) + 1
+        #bytes downloaded by a client loading every bundle once
+        bundle_size = chunk_size = 0
+        for kind, files in bundle_list:
+            bundle_size += _size(files)
+            self.stdout.write('%s %s\n' % (kind, ','.join(files)))
+            for chunk in plan[(kind, files)]:
+                self.stdout.write('    %2d bundles %9d bytes  %s\n' % (
+                    shared[(kind, chunk)], _size(chunk), ','.join(chunk)))
+        for kind, chunk in shared:
+            chunk_size += _size(chunk)
+        self.stdout.write('%d bundles, %d chunks, %d bytes instead of %d\n' % (
+            len(bundle_list), len(shared), chunk_size, bundle_size))
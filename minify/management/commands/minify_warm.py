@@ -0,0 +1,63 @@
+"""
+Management command minifying all bundles used by the js and css
+template tags into the bundle cache
+"""
+
+import sys
+from optparse import make_option
+
+from django.core.cache import cache
+from django.core.management.base import NoArgsCommand
+
+from minify import bundlecache
+from minify import executors
+from minify import splitting
+
+#cache backends whose content the server processes can't see
+PROCESS_LOCAL_BACKENDS = ('locmem', 'dummy')
+
+
+class Command(NoArgsCommand):
+    help = ('Minifies all bundles referenced by js and css template tags '
+            'into the cache, so the first requests after a deploy do not '
+            'have to.')
+    option_list = NoArgsCommand.option_list + (
+        make_option('--workers', dest='workers', type='int', default=None,
+            help='Number of processes building bundles (default: MINIFY_EXECUTOR).'),
+    )
+
+    def handle_noargs(self, **options):
+        verbosity = int(options.get('verbosity', 1))
+        backend = cache.__module__.rsplit('.', 1)[-1]
+        if backend in PROCESS_LOCAL_BACKENDS:
+            sys.stderr.write('Warning: the %s cache backend is local to this process, '
+                             'set CACHE_BACKEND to a shared cache (like memcached) for '
+                             'the server processes to use the bundles.\n' % backend)
+        executor = None
+        if options['workers']:
+            executor = executors.ProcessPoolExecutor(options['workers'])
+        bundle_list = splitting.find_served_bundles()
+        try:
+            results = bundlecache.warm_bundles(bundle_list, executor)
+        finally:
+            if executor is not None:
+                executor.close()
+        built = not_cacheable = 0
+        for kind, files, seconds, size, error in results:
+            if error == bundlecache.NOT_CACHEABLE:
+                not_cacheable += 1
+                if verbosity > 0:
+                    self.stdout.write('%-3s not cacheable (remote files or views)  %s\n' % (
+                        kind, ','.join(files)))
+                continue
+            if error is not None:
+                sys.stderr.write('Could not build %s bundle %s: %s\n' % (
+                    kind, ','.join(files), error))
+                continue
+            built += 1
+            if verbosity > 0:
+                self.stdout.write('%-3s %8.1f ms %9d bytes  %s\n' % (
+                    kind, seconds * 1000, size, ','.join(files)))
+        if verbosity > 0:
+            self.stdout.write('Cached %d of %d bundles, %d not cacheable\n' % (
+                built, len(bundle_list), not_cacheable))
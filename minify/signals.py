@@ -0,0 +1,25 @@
+"""
+Signals sent along the minify pipeline, to find out where the time
+goes. Durations are in seconds, sizes in bytes. ``minify.instrumentation``
+has receivers logging them or adding them up.
+"""
+
+from django.dispatch import Signal
+
+#a file was read, ``source`` is 'path' (MINIFY_PATHS), 'root' (STATIC_ROOT
+#or MEDIA_ROOT), 'view' or 'remote'
+file_read = Signal(providing_args=['filename', 'source', 'seconds', 'size'])
+
+#a file was minified, or its minified content was cached (``cached``).
+#``size`` is ``None`` if a cached file wasn't read
+file_minified = Signal(providing_args=['filename', 'version', 'seconds', 'size',
+                                       'minified_size', 'cached'])
+
+#a bundle was built for the bundle cache, the sender is its kind
+bundle_built = Signal(providing_args=['files', 'seconds', 'size'])
+
+#a minify view responded with a bundle, the sender is its kind. ``size``
+#is ``None`` for streamed responses, ``cached`` is ``False`` if the
+#bundle had to be built
+bundle_served = Signal(providing_args=['files', 'seconds', 'size', 'cached',
+                                       'encoding'])
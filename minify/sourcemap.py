@@ -0,0 +1,178 @@
+"""
+Building source maps (revision 3) for combined and minified bundles, see
+https://sourcemaps.info/spec.html
+"""
+
+import re
+
+from django.utils import simplejson
+
+_BASE64 = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+_NEWLINE = re.compile(r'\n')
+
+
+def _encode_vlq(value):
+    if value < 0:
+        value = (-value << 1) | 1
+    else:
+        value <<= 1
+    encoded = []
+    while True:
+        digit = value & 31
+        value >>= 5
+        if value:
+            digit |= 32
+        encoded.append(_BASE64[digit])
+        if not value:
+            return ''.join(encoded)
+
+#most deltas between segments are small
+_VLQ = dict((value, _encode_vlq(value)) for value in range(-1024, 1024))
+
+def encode_vlq(value):
+    """Encodes an integer as a base64 VLQ like the ``mappings``
+    of a source map"""
+    encoded = _VLQ.get(value)
+    if encoded is None:
+        encoded = _encode_vlq(value)
+    return encoded
+
+def count_lines(content):
+    """Returns the number of lines of ``content`` the way a source map
+    counts them, a trailing line without newline included"""
+    return content.count('\n') + 1
+
+def line_starts(content):
+    """Returns the offsets of the beginnings of the lines of ``content``"""
+    return [0] + [match.end() for match in _NEWLINE.finditer(content)]
+
+
+class SourceMap(object):
+    """Mappings of positions in a generated file to positions in
+    its sources. Lines and columns start at 0.
+    """
+
+    def __init__(self, file=None):
+        self.file = file
+        self.sources = []
+        self.sources_content = []
+        self.lines = []
+
+    def add_source(self, name, content=None):
+        """Adds a source and returns its index
+
+        Params:
+            - ``name``: the url of the source
+            - ``content`` (optional): the content of the source,
+              embedded in the source map
+        """
+        if isinstance(content, str):
+            content = content.decode('utf-8', 'replace')
+        self.sources.append(name)
+        self.sources_content.append(content)
+        return len(self.sources) - 1
+
+    def add(self, generated_line, generated_column, source, line, column):
+        """Maps a position of the generated file to a position of
+        ``source``, the index returned by ``add_source``. Mappings of
+        a line have to be added in the order of their columns.
+        """
+        while len(self.lines) <= generated_line:
+            self.lines.append([])
+        self.lines[generated_line].append((generated_column, source, line, column))
+
+    def add_lines(self, generated_line, source, count):
+        """Maps ``count`` lines of the generated file starting at
+        ``generated_line`` one to one to the lines of ``source``,
+        like it is the case for a file which was only combined
+        with others."""
+        for line in range(count):
+            self.add(generated_line + line, 0, source, line, 0)
+
+    def add_offsets(self, generated_line, source, generated, original, offsets):
+        """Maps positions of ``generated``, the minified content of
+        ``source`` starting at line ``generated_line`` of the generated
+        file, to positions of ``original``, the content of ``source``.
+        Columns are counted in bytes.
+
+        Params:
+            - ``offsets``: a list of ``(generated offset, original offset)``
+              tuples in increasing order, like the ``mappings`` filled by
+              ``jsmin`` and ``cssmin``
+        """
+        generated_starts = line_starts(generated)
+        original_starts = line_starts(original)
+        generated_index = original_index = 0
+        generated_end = len(generated_starts) - 1
+        original_end = len(original_starts) - 1
+        while len(self.lines) < generated_line + len(generated_starts):
+            self.lines.append([])
+        segments = self.lines[generated_line]
+        for generated_offset, original_offset in offsets:
+            if generated_index < generated_end and \
+                    generated_starts[generated_index + 1] <= generated_offset:
+                while generated_index < generated_end and \
+                        generated_starts[generated_index + 1] <= generated_offset:
+                    generated_index += 1
+                segments = self.lines[generated_line + generated_index]
+            while original_index < original_end and \
+                    original_starts[original_index + 1] <= original_offset:
+                original_index += 1
+            segments.append((generated_offset - generated_starts[generated_index], source,
+                             original_index, original_offset - original_starts[original_index]))
+
+    def mappings(self):
+        """Returns the encoded ``mappings`` field"""
+        lines = []
+        vlq = _VLQ
+        previous_source = previous_line = previous_column = 0
+        for segments in self.lines:
+            encoded = []
+            previous_generated_column = 0
+            for generated_column, source, line, column in segments:
+                try:
+                    encoded.append(vlq[generated_column - previous_generated_column] +
+                                   vlq[source - previous_source] +
+                                   vlq[line - previous_line] +
+                                   vlq[column - previous_column])
+                except KeyError:
+                    encoded.append(''.join((
+                        encode_vlq(generated_column - previous_generated_column),
+                        encode_vlq(source - previous_source),
+                        encode_vlq(line - previous_line),
+                        encode_vlq(column - previous_column),
+                    )))
+                previous_generated_column = generated_column
+                previous_source, previous_line, previous_column = source, line, column
+            lines.append(','.join(encoded))
+        return ';'.join(lines)
+
+    def as_dict(self):
+        source_map = {
+            'version': 3,
+            'sources': self.sources,
+            'names': [],
+            'mappings': self.mappings(),
+        }
+        if self.file:
+            source_map['file'] = self.file
+        if any(content is not None for content in self.sources_content):
+            source_map['sourcesContent'] = self.sources_content
+        return source_map
+
+    def to_json(self):
+        return simplejson.dumps(self.as_dict())
+
+    def data_url(self):
+        """Returns the source map as ``data:`` url, to be inlined
+        into the generated file"""
+        return 'data:application/json;charset=utf-8;base64,%s' % \
+            self.to_json().encode('base64').replace('\n', '')
+
+
+def source_mapping_comment(kind, url):
+    """Returns the comment referencing the source map at ``url``
+    from a ``'js'`` or ``'css'`` file"""
+    if kind == 'css':
+        return '/*# sourceMappingURL=%s */' % url
+    return '//# sourceMappingURL=%s' % url
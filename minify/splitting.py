@@ -0,0 +1,109 @@
+"""
+Splitting the bundles used by templates and settings into chunks
+shared by several bundles and chunks used by a single one, so pages
+loading overlapping files download and cache the shared files once.
+
+A file's chunk is decided by the set of bundles containing it: the
+consecutive files of a bundle which are contained in the same set of
+bundles form a chunk. Chunks keep the order of the files, a bundle is
+always the concatenation of its chunks. If bundles sharing files list
+them in different orders, each of these files becomes a chunk of its
+own.
+
+With ``MINIFY_SPLIT_BUNDLES`` the js and css tags point to the chunks
+of the bundles found by ``bundles.find_bundles`` instead of the bundles.
+"""
+
+from minify import app_settings
+from minify import bundles
+
+
+def split_bundles(bundle_list, min_shared=2):
+    """Splits bundles into shared and not shared chunks.
+
+    Params:
+        - ``bundle_list``: a list of ``(kind, files)`` tuples like
+          returned by ``bundles.find_bundles``
+        - ``min_shared`` (optional): the number of bundles a file has
+          to be contained in to be split off into a shared chunk
+
+    Returns:
+        - a dictionary mapping the ``(kind, files)`` tuples of
+          ``bundle_list`` to the list of their chunks, tuples of files
+    """
+    plan = {}
+    for kind in set(kind for kind, files in bundle_list):
+        kind_bundles = [files for bundle_kind, files in bundle_list if bundle_kind == kind]
+        containing = {}
+        for index, files in enumerate(kind_bundles):
+            for filename in files:
+                containing.setdefault(filename, set()).add(index)
+        #runs of consecutive files per bundle, with the bundles containing
+        #them, or None if they aren't shared
+        bundle_runs = []
+        shared_runs = {}
+        for files in kind_bundles:
+            runs = []
+            for filename in files:
+                signature = None
+                if len(containing[filename]) >= min_shared:
+                    signature = frozenset(containing[filename])
+                if runs and runs[-1][0] == signature:
+                    runs[-1][1].append(filename)
+                else:
+                    runs.append((signature, [filename]))
+            for signature, run in runs:
+                if signature is not None:
+                    shared_runs.setdefault(signature, set()).add(tuple(run))
+            bundle_runs.append(runs)
+        for files, runs in zip(kind_bundles, bundle_runs):
+            chunks = []
+            for signature, run in runs:
+                if signature is None or len(shared_runs[signature]) == 1:
+                    chunks.append(tuple(run))
+                else:
+                    #the bundles don't agree on the order of these files
+                    chunks.extend((filename,) for filename in run)
+            plan[(kind, files)] = chunks
+    return plan
+
+def find_chunks(bundle_list, min_shared=2):
+    """Returns the unique ``(kind, files)`` tuples of the chunks
+    of ``bundle_list``, see ``split_bundles``"""
+    plan = split_bundles(bundle_list, min_shared)
+    chunks = []
+    for kind, files in bundle_list:
+        for chunk in plan[(kind, files)]:
+            if (kind, chunk) not in chunks:
+                chunks.append((kind, chunk))
+    return chunks
+
+def find_served_bundles():
+    """Returns the ``(kind, files)`` tuples of the bundles the js and
+    css tags point to, the chunks of the bundles found by
+    ``bundles.find_bundles`` with ``MINIFY_SPLIT_BUNDLES``"""
+    bundle_list = bundles.find_bundles()
+    if app_settings.MINIFY_SPLIT_BUNDLES:
+        return find_chunks(bundle_list)
+    return bundle_list
+
+
+_plan = None
+
+def get_chunks(kind, files):
+    """Returns the chunks to load instead of a bundle, from the
+    templates and settings scanned once per process.
+
+    Params:
+        - ``kind``: ``'js'`` or ``'css'``
+        - ``files``: the list of files of the bundle
+
+    Returns:
+        - a list of tuples of files, the bundle itself if it wasn't
+          found by ``bundles.find_bundles``
+    """
+    global _plan
+    if _plan is None:
+        _plan = split_bundles(bundles.find_bundles())
+    files = tuple(files)
+    return _plan.get((kind, files), [files])
@@ -3,24 +3,48 @@ Tag rendering tags pointing ot minified/not-minified
 Javascript or CSS content
 """
 
+import re
+import time
+
 from django import template
+from django.template import loader
 from django.core import urlresolvers
+from django.utils.functional import lazy, memoize
 
 from minify import app_settings
+from minify import build
+from minify import bundlecache
+from minify import bundles
+from minify import splitting
+from minify import utils
 
 register = template.Library()
 
 
-MINIFY_JS_URL = urlresolvers.reverse('minify_js')
-MINIFY_CSS_URL = urlresolvers.reverse('minify_css')
-NOMINIFY_JS_URL = urlresolvers.reverse('nominify_js')
-NOMINIFY_CSS_URL = urlresolvers.reverse('nominify_css')
+_urls = {}
+#reversed once per process when a tag is rendered first, reversing them
+#when the tags are loaded would import the whole URLconf with its views
+_reverse = memoize(urlresolvers.reverse, _urls, 1)
+
+MINIFY_JS_URL = lazy(_reverse, str)('minify_js')
+MINIFY_CSS_URL = lazy(_reverse, str)('minify_css')
+NOMINIFY_JS_URL = lazy(_reverse, str)('nominify_js')
+NOMINIFY_CSS_URL = lazy(_reverse, str)('nominify_css')
+#closing tags within inlined content
+_CLOSING_TAG_RE = {
+    'js': re.compile(r'</(script)', re.IGNORECASE),
+    'css': re.compile(r'</(style)', re.IGNORECASE),
+}
+#the number of rendered tags kept by MinifyNode before starting over
+MAX_RENDERED = 1000
+
+_rendered = {}
 
 
-@register.inclusion_tag('minify/js.html')
-def js(files_in_string, from_url=None):
-    """Renders <script> tags pointing to the minify or nominify
-    javascript views according to MINIFY_DEBUG setting
+def js(files_in_string, from_url=None, inline=None):
+    """Returns the context of the minify/js.html template rendering
+    <script> tags pointing to the minify or nominify javascript views
+    according to MINIFY_DEBUG setting
     
     Params:
     - files_in_string: a string of comma seperated Javascript file
@@ -29,33 +53,32 @@ def js(files_in_string, from_url=None):
     apps or project without GET parameters (just the path),
     this view should return a response with mimetype=
     "text/javascript"
+    - inline (optional): "inline" to embed the minified content
+    in the <script> tags instead of pointing to it, or the maximum
+    size in bytes of bundles to embed, see _inline_bundle
     """
-    is_grouped = False
     script_paths = []
-    
-    if files_in_string.find('.js') == -1:
-        #use a setting (app_settings.settings bcs from the global settings)
-        files_array = getattr(app_settings.settings, files_in_string, [])
-        if files_array and isinstance(files_array[0], (list, tuple)):
-            is_grouped = True
-    else:
-        files_in_string = files_in_string.replace(' ','')
-        files_array = files_in_string.split(',')
+    files_array, is_grouped = bundles.get_files_array(files_in_string, '.js')
     
     if app_settings.MINIFY_DEBUG:
-        base_url = NOMINIFY_JS_URL
+        base_url = _reverse('nominify_js')
     else:
-        base_url = MINIFY_JS_URL
+        base_url = _reverse('minify_js')
     
     construct_function = _get_construct_function()
     if is_grouped is False:
-        script_paths = construct_function(base_url, files_array, from_url)
+        if from_url:
+            script_paths = construct_function(base_url, files_array, from_url)
+        else:
+            script_paths = _inline_bundle('js', files_array, inline) or \
+                _construct_split_paths('js', construct_function, base_url, files_array)
     else:
         if from_url:
             from_url_group = construct_function(base_url, [], from_url)
             script_paths.append(from_url_group)
         for file_group in files_array:
-            script_group = construct_function(base_url, file_group)
+            script_group = _inline_bundle('js', file_group, inline) or \
+                _construct_split_paths('js', construct_function, base_url, file_group)
             script_paths.append(script_group)
             
     return {
@@ -64,38 +87,34 @@ def js(files_in_string, from_url=None):
     }
     
 
-@register.inclusion_tag('minify/css.html')
-def css(files_in_string):
-    """Renders <link> tags pointing to the minify or nominify
-    CSS views according to MINIFY_DEBUG setting
+def css(files_in_string, inline=None):
+    """Returns the context of the minify/css.html template rendering
+    <link> tags pointing to the minify or nominify CSS views according
+    to MINIFY_DEBUG setting
     
     Params:
     - files_in_string: a string of comma seperated CSS file
     paths within app_settings.MINIFY_CSS_PATH
+    - inline (optional): "inline" to render <style> tags with the
+    minified content instead of <link> tags, or the maximum size
+    in bytes of bundles to embed, see _inline_bundle
     """
-    is_grouped = False
     css_paths = []
-    
-    if files_in_string.find('.css') == -1:
-        #use a setting (app_settings.settings bcs from the global settings)
-        files_array = getattr(app_settings.settings, files_in_string, [])
-        if files_array and isinstance(files_array[0], (list, tuple)):
-            is_grouped = True
-    else:
-        files_in_string = files_in_string.replace(' ','')
-        files_array = files_in_string.split(',')
+    files_array, is_grouped = bundles.get_files_array(files_in_string, '.css')
     
     if app_settings.MINIFY_DEBUG:
-        base_url = NOMINIFY_CSS_URL
+        base_url = _reverse('nominify_css')
     else:
-        base_url = MINIFY_CSS_URL
+        base_url = _reverse('minify_css')
         
     construct_function = _get_construct_function()
     if is_grouped is False:
-        css_paths = construct_function(base_url, files_array)
+        css_paths = _inline_bundle('css', files_array, inline) or \
+            _construct_split_paths('css', construct_function, base_url, files_array)
     else:
         for file_group in files_array:
-            css_group = construct_function(base_url, file_group)
+            css_group = _inline_bundle('css', file_group, inline) or \
+                _construct_split_paths('css', construct_function, base_url, file_group)
             css_paths.append(css_group)
     
     return {
@@ -104,6 +123,174 @@ def css(files_in_string):
     }
     
 
+TAGS = {
+    'js': (js, 'minify/js.html', 3),
+    'css': (css, 'minify/css.html', 2),
+}
+
+
+class MinifyNode(template.Node):
+    """Renders the js or css tag. The output only depends on the
+    arguments, the settings and the versions of the files, so it is
+    kept per arguments and rendered again when the version of one of
+    the bundles changed, which is checked at most every
+    app_settings.MINIFY_INDEX_CHECK_INTERVAL seconds (like the versions
+    themselves). Tags with files which are not on disk have no version
+    to check, they are rendered every time.
+    """
+    
+    def __init__(self, kind, args):
+        self.kind = kind
+        self.args = args
+    
+    def render(self, context):
+        args = tuple([arg.resolve(context) for arg in self.args])
+        key = (self.kind, args, context.autoescape, app_settings.MINIFY_DEBUG,
+               app_settings.MINIFY_DEBUG_COMBINE, app_settings.MINIFY_SPLIT_BUNDLES)
+        try:
+            entry = _rendered.get(key)
+        except TypeError:
+            #unhashable arguments
+            return self._render(args, context)
+        now = time.time()
+        if entry is not None and now - entry[0] < app_settings.MINIFY_INDEX_CHECK_INTERVAL:
+            return entry[2]
+        versions = _get_versions(self.kind, args[0])
+        if entry is not None and entry[1] == versions:
+            _rendered[key] = (now, versions, entry[2])
+            return entry[2]
+        output = self._render(args, context)
+        if None in versions:
+            _rendered.pop(key, None)
+            return output
+        if len(_rendered) >= MAX_RENDERED:
+            _rendered.clear()
+        _rendered[key] = (now, versions, output)
+        return output
+    
+    def _render(self, args, context):
+        function, template_name, max_args = TAGS[self.kind]
+        return loader.get_template(template_name).render(
+            template.Context(function(*args), autoescape=context.autoescape))
+
+
+def _get_versions(kind, files_in_string):
+    """Utility function returning the versions of the bundles
+    of a tag, None for bundles not on disk"""
+    return tuple([utils.get_files_version(files) for files
+                  in bundles.get_file_groups(files_in_string, bundles.EXTENSIONS[kind])])
+
+def clear_rendered():
+    """Forgets all rendered tags, after changing settings
+    or the templates of the tags at runtime"""
+    _rendered.clear()
+
+def do_minify_tag(parser, token):
+    """Compiles {% js files [from_url] [inline] %} and
+    {% css files [inline] %} into a MinifyNode"""
+    bits = token.split_contents()
+    kind = bits[0]
+    max_args = TAGS[kind][2]
+    if not 1 < len(bits) <= max_args + 1:
+        raise template.TemplateSyntaxError(
+            '%r tag takes 1 to %d arguments' % (kind, max_args))
+    args = [parser.compile_filter(bit) for bit in bits[1:]]
+    if len(args) == max_args:
+        #the inline argument, variables are checked when rendering
+        inline = args[-1]
+        if not inline.filters and not isinstance(inline.var, template.Variable):
+            literal = inline.var
+        else:
+            literal = getattr(inline.var, 'literal', None)
+        if literal is not None and not _is_inline_argument(literal):
+            raise template.TemplateSyntaxError(
+                '%r tag takes "inline" or a number of bytes as its last argument, '
+                'not %r' % (kind, literal))
+    return MinifyNode(kind, args)
+
+register.tag('js', do_minify_tag)
+register.tag('css', do_minify_tag)
+
+
+class InlineBundle(object):
+    """The minified content of a bundle embedded into the page,
+    rendered by the js/css templates instead of a url path. Only
+    ``</script`` and ``</style`` are escaped in the content, ``<!--``
+    is not."""
+    
+    inline = True
+    
+    def __init__(self, kind, content):
+        #the content must not end the <script> or <style> element
+        self.content = _CLOSING_TAG_RE[kind].sub(r'<\\/\1', content)
+
+
+def _is_inline_argument(inline):
+    """Returns True if ``inline`` is empty, "inline" or a number of bytes"""
+    if not inline or inline == 'inline':
+        return True
+    try:
+        int(inline)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+def _inline_bundle(kind, files_array, inline):
+    """Utility function returning the minified content of
+    a bundle to embed into the page, from the bundle cache
+    (shared with the minify views) so it is only built once
+    per version of the files.
+    
+    Params:
+    - kind: 'js' or 'css'
+    - files_array: a list of relative paths to files within
+    app_settings.MINIFY_PATHS
+    - inline: the inline argument of the tags, "inline" to
+    always embed the bundle, a number of bytes to embed it only
+    if its minified content is not larger, otherwise None
+    
+    Returns:
+    - a list with an InlineBundle or None if the bundle should
+    not be embedded (or app_settings.MINIFY_DEBUG is set or inline
+    is not a valid argument)
+    """
+    if not inline or app_settings.MINIFY_DEBUG or not _is_inline_argument(inline):
+        return None
+    files_array = bundlecache.normalize_files(files_array)
+    if not files_array:
+        return None
+    content = bundlecache.get_bundle(kind, files_array,
+                                     lambda: bundlecache.build_bundle(kind, files_array))
+    if kind == 'js':
+        #the newline build_bundle starts Javascript bundles with
+        content = content[1:]
+    if inline != 'inline' and len(content) > int(inline):
+        return None
+    return [InlineBundle(kind, content)]
+
+def _construct_split_paths(kind, construct_function, base_url, files_array):
+    """Utility function constructing the url paths of a bundle
+    with the construct function, or with app_settings.MINIFY_SPLIT_BUNDLES
+    the url paths of its chunks, see minify.splitting.
+    
+    Params:
+    - kind: 'js' or 'css'
+    - construct_function: the function returned by _get_construct_function
+    - base_url: the url of pointing to the view either not
+    minifying CSS or Javascript
+    - files_array: a list of relative paths to files within
+    app_settings.MINIFY_PATHS
+    
+    Returns:
+    - a list of url paths
+    """
+    if not app_settings.MINIFY_SPLIT_BUNDLES or app_settings.MINIFY_DEBUG:
+        return construct_function(base_url, files_array)
+    url_paths = []
+    for chunk in splitting.get_chunks(kind, bundlecache.normalize_files(files_array)):
+        url_paths.extend(construct_function(base_url, list(chunk)))
+    return url_paths
+
 def _get_construct_function():
     """Utility function which return 
     the function to contruct minify url paths
@@ -133,14 +320,19 @@ def _construct_nominify_paths(base_url, files_array, from_url=None):
     
     Returns:
     - a list of url paths which should be used in the js/css
-    templates to render script or link tags
+    templates to render script or link tags, one per file or one
+    for all files with app_settings.MINIFY_DEBUG_COMBINE
     """
     url_paths = []
     if from_url:
         url_paths.append('%s?url=%s' % (base_url, from_url))
+    files_array = [filename for filename in files_array if filename]
+    if app_settings.MINIFY_DEBUG_COMBINE:
+        if files_array:
+            url_paths.append('%s?files=%s' % (base_url, ','.join(files_array)))
+        return url_paths
     for filename in files_array:
-        if filename:
-            url_paths.append('%s?file=%s' % (base_url, filename))
+        url_paths.append('%s?file=%s' % (base_url, filename))
     return url_paths
 
 def _construct_minify_paths(base_url, files_array, from_url=None):
@@ -159,10 +351,20 @@ def _construct_minify_paths(base_url, files_array, from_url=None):
     
     Returns:
     - a list of url paths which should be used in the js/css
-    templates to render script or link tags
+    templates to render script or link tags, pointing to the
+    file written by the minify_build command if there is one,
+    otherwise versioned with a digest of the files' content
     """
     url_paths = []
+    if not from_url:
+        built_url = build.get_built_url(files_array)
+        if built_url:
+            url_paths.append(built_url)
+            return url_paths
     url_path = '%s?files=%s' % (base_url, ','.join(files_array))
+    version = not from_url and utils.get_files_version(files_array)
+    if version:
+        url_path = '%s&v=%s' % (url_path, version)
     if from_url:
         url_paths.append('%s&url=%s' % (url_path, from_url))
     else:
@@ -1,10 +1,45 @@
 import unittest
 import os
+import sys
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import BaseHTTPServer
+import SocketServer
+import gzip
+from StringIO import StringIO
 
+from django.utils import simplejson
+
+from django import http
+from django import template
 from django.test import client
+from django.core import management
 from django.core import urlresolvers
+from django.core.cache import cache
 
 from minify import app_settings
+from minify import utils
+from minify import filecache
+from minify import build
+from minify import compress
+from minify import bundlecache
+from minify import bundles
+from minify import devcache
+from minify import dynamic
+from minify import executors
+from minify import fetch
+from minify import fileindex
+from minify import instrumentation
+from minify import signals
+from minify import sourcemap
+from minify import splitting
+from minify.templatetags import minify_tags
+from minify.cssmin import cssmin
+from minify.jsmin import jsmin, JavascriptMinify, UnterminatedComment, \
+    UnterminatedStringLiteral, UnterminatedRegularExpression
 
 
 class MinifyTestCase(unittest.TestCase):
@@ -62,5 +97,967 @@ class MinifyTestCase(unittest.TestCase):
             self.assertTrue('text/css' in response['Content-Type'])
             print response.content
             self.assertTrue(len(response.content) > 0)
+
+
+class JsminTestCase(unittest.TestCase):
+    def _reference_jsmin(self, js):
+        outs = StringIO()
+        JavascriptMinify().minify(StringIO(js), outs)
+        return outs.getvalue().lstrip('\n')
+    
+    def test_same_output_as_reference(self):
+        for path in app_settings.MINIFY_PATHS:
+            for t in os.walk(path):
+                for filename in t[2]:
+                    if filename.endswith('.js'):
+                        js = utils.read_from_file(os.path.join(t[0], filename))
+                        self.assertEqual(jsmin(js), self._reference_jsmin(js))
+    
+    def test_whitespace_and_comments(self):
+        self.assertEqual(jsmin('var a = 1 ;\r\n// comment\nvar  b=/* c */2'),
+                         'var a=1;var b=2')
+        self.assertEqual(jsmin('a = b\n/x y/.test(c)'), 'a=b\n/x y/.test(c)')
+        self.assertEqual(jsmin('s = " a  /* b */ "'), 's=" a  /* b */ "')
+    
+    def test_errors(self):
+        self.assertRaises(UnterminatedComment, jsmin, 'a /* b')
+        self.assertRaises(UnterminatedStringLiteral, jsmin, 'a = "b\n"')
+        self.assertRaises(UnterminatedRegularExpression, jsmin, 'a = /b\n/')
+
+
+class CssminTestCase(unittest.TestCase):
+    def test_whitespace_and_comments(self):
+        self.assertEqual(cssmin('/* a */\na , b > c {\n\tcolor : red ;\n}\n'),
+                         'a,b>c{color:red}')
+        self.assertEqual(cssmin('a :hover { margin: 0 auto !important; }'),
+                         'a :hover{margin:0 auto!important}')
+        self.assertEqual(cssmin('/*! license */ a{}'), '/*! license */ a{}')
+    
+    def test_strings_and_urls(self):
+        self.assertEqual(cssmin('a { content: "a  ;  }  b"; background: url( a\\ b.png ) }'),
+                         'a{content:"a  ;  }  b";background:url(a\\ b.png)}')
+        self.assertEqual(cssmin("a { background: url( 'x.png' ) no-repeat }"),
+                         "a{background:url('x.png') no-repeat}")
+    
+    def test_colors_and_zero_lengths(self):
+        self.assertEqual(cssmin('#aabbcc { color: #AABBCC; margin: 0px 0.5px 10px 0.0em }'),
+                         '#aabbcc{color:#ABC;margin:0 0.5px 10px 0}')
+        self.assertEqual(cssmin('a { width: calc(0px + 1em); transition: color 0s }'),
+                         'a{width:calc(0px + 1em);transition:color 0s}')
+    
+    def test_media_blocks(self):
+        self.assertEqual(cssmin('@media screen and (max-width: 100px) {\n  #ffffff { color: #ffffff; }\n}'),
+                         '@media screen and (max-width:100px){#ffffff{color:#fff}}')
+        self.assertEqual(cssmin('@layer base { a :hover {color:#aabbcc} }'),
+                         '@layer base{a :hover{color:#abc}}')
+        self.assertEqual(cssmin('@container (min-width: 0px) { a :hover { margin: 0px } }'),
+                         '@container (min-width:0px){a :hover{margin:0}}')
+        self.assertEqual(cssmin('@scope (.card) { a :hover { color: red } }'),
+                         '@scope (.card){a :hover{color:red}}')
+        self.assertEqual(cssmin('@page :first { margin : 0px; @top-left { color : #aabbcc } }'),
+                         '@page :first{margin:0;@top-left{color:#abc}}')
+        self.assertEqual(cssmin('@font-face { font-family : a; src : url(a.woff) }'),
+                         '@font-face{font-family:a;src:url(a.woff)}')
+    
+    def test_flex_units(self):
+        self.assertEqual(cssmin('a { flex: 0 0 0px; -ms-flex: 1 1 0%; margin: 0px }'),
+                         'a{flex:0 0 0px;-ms-flex:1 1 0%;margin:0}')
+        self.assertEqual(cssmin('a { flex-basis: 0px }'), 'a{flex-basis:0}')
+
+
+class FileCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    def test_make_key(self):
+        key = filecache.make_key('var a = 1;', 'jsmin-1')
+        self.assertEqual(key, filecache.make_key('var a = 1;', 'jsmin-1'))
+        self.assertNotEqual(key, filecache.make_key('var a = 2;', 'jsmin-1'))
+        self.assertNotEqual(key, filecache.make_key('var a = 1;', 'jsmin-2'))
+    
+    def test_disk_cache(self):
+        file_cache = filecache.DiskFileCache(self.directory, 1000)
+        self.assertEqual(file_cache.get('minify:a'), None)
+        file_cache.set('minify:a', 'a' * 10)
+        self.assertEqual(file_cache.get('minify:a'), 'a' * 10)
+    
+    def test_disk_cache_eviction(self):
+        file_cache = filecache.DiskFileCache(self.directory, 1000)
+        for i in range(5):
+            file_cache.set('minify:%d' % i, 'a' * 300)
+            os.utime(file_cache._path('minify:%d' % i), (i, i))
+        self.assertTrue(file_cache.size <= 1000)
+        self.assertEqual(file_cache.get('minify:0'), None)
+        self.assertEqual(file_cache.get('minify:4'), 'a' * 300)
+    
+    def test_cached_minify(self):
+        calls = []
+        def minifier(content):
+            calls.append(content)
+            return content.strip()
+        self.assertEqual(filecache.cached_minify(' a ', minifier, 'test-1'), 'a')
+        self.assertEqual(filecache.cached_minify(' a ', minifier, 'test-1'), 'a')
+        self.assertEqual(calls, [' a '])
+
+
+class BuildTestCase(unittest.TestCase):
+    def setUp(self):
+        self.template_dir = tempfile.mkdtemp()
+        self.build_root = tempfile.mkdtemp()
+        template = open(os.path.join(self.template_dir, 'page.html'), 'w')
+        template.write('{% load minify_tags %}\n'
+                       '{% css "libs/reset.css, main.css" %}\n'
+                       '{% js "JS_FILES" %}\n'
+                       '{% js "index.js" "/some/view/" %}\n')
+        template.close()
+    
+    def tearDown(self):
+        shutil.rmtree(self.template_dir)
+        shutil.rmtree(self.build_root)
+        build._manifest = None
+    
+    def test_find_template_tags(self):
+        self.assertEqual(bundles.find_template_tags([self.template_dir]), [
+            ('css', 'libs/reset.css, main.css', None),
+            ('js', 'JS_FILES', None),
+            ('js', 'index.js', '/some/view/'),
+        ])
+    
+    def test_find_bundles(self):
+        found = bundles.find_bundles([self.template_dir])
+        self.assertTrue(('css', ('libs/reset.css', 'main.css')) in found)
+        self.assertTrue(('js', ('index.js',)) in found)
+        self.assertTrue(('js', ('jquery/jquery-1.5.1.js', 'jquery/ui/jquery-ui-1.8.10.custom.js')) in found)
+        self.assertEqual(len(found), len(set(found)))
+    
+    def test_build_bundles(self):
+        manifest, errors = build.build_bundles([('js', ('index.js',))], self.build_root)
+        self.assertEqual(errors, [])
+        filename = manifest['index.js']
+        self.assertTrue(filename.startswith('bundle.') and filename.endswith('.js'))
+        content = open(os.path.join(self.build_root, filename)).read()
+        self.assertEqual(content, utils.minify_js_from_files(None, ['index.js']))
+        self.assertTrue(os.path.exists(os.path.join(self.build_root, build.MANIFEST_NAME)))
+    
+    def test_get_built_url(self):
+        build._manifest = {'index.js': 'bundle.0123456789ab.js'}
+        self.assertEqual(build.get_built_url(['index.js']),
+                         '%sbundle.0123456789ab.js' % app_settings.MINIFY_BUILD_URL)
+        self.assertEqual(build.get_built_url(['main.js']), None)
+
+
+class ExecutorTestCase(unittest.TestCase):
+    def test_serial_executor(self):
+        executor = executors.SerialExecutor()
+        self.assertEqual(executor.map(len, ['a', 'bb', '']), [1, 2, 0])
+    
+    def test_process_pool_executor(self):
+        executor = executors.ProcessPoolExecutor(2)
+        try:
+            jobs = [(utils.minify_js, 'var a = 1;'), (utils.minify_css, 'a { color: red; }')]
+            self.assertEqual(executor.map(executors.call, jobs), ['var a=1;', 'a{color:red}'])
+        finally:
+            executor.close()
+    
+    def test_cached_minify_many(self):
+        calls = []
+        def minifier(content):
+            calls.append(content)
+            return content.strip()
+        items = [(' a ', minifier, None), (' b ', minifier, None), (' a ', minifier, None)]
+        self.assertEqual(filecache.cached_minify_many(items), ['a', 'b', 'a'])
+        self.assertEqual(sorted(calls), [' a ', ' b '])
+    
+    def test_minify_bundles(self):
+        bundle_list = [('js', ['index.js', 'head.load.min.js']), ('css', ['main.css'])]
+        self.assertEqual(utils.minify_bundles(None, bundle_list), [
+            utils.minify_js_from_files(None, ['index.js', 'head.load.min.js']),
+            utils.minify_css_from_files(None, ['main.css']),
+        ])
+
+
+class SourcesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index_js = os.path.abspath(os.path.join(app_settings.settings.MEDIA_ROOT, 'js', 'index.js'))
+    
+    def test_find_in_url_roots(self):
+        self.assertEqual(utils.find_in_url_roots('/media/js/index.js'), self.index_js)
+        self.assertEqual(utils.find_in_url_roots('/media/js/index.js?v=1'), self.index_js)
+        self.assertEqual(utils.find_in_url_roots('/media/../settings.py'), None)
+        self.assertEqual(utils.find_in_url_roots('/other/js/index.js'), None)
+    
+    def test_local_path_read_from_disk(self):
+        self.assertEqual(utils.check_and_read_from_file(None, '/media/js/index.js'),
+                         utils.read_from_file(self.index_js))
+    
+    def test_local_path_read_from_view(self):
+        self.assertEqual(utils.check_and_read_from_file(None, '/minify/css2/?file=main.css'),
+                         utils.check_and_read_from_file(None, 'main.css'))
+        self.assertEqual(utils.check_and_read_from_file(None, '/does/not/exist/'), '')
+    
+    def test_local_path_read_anonymously(self):
+        request = http.HttpRequest()
+        request.COOKIES['visitor'] = 'alice'
+        request.META['HTTP_COOKIE'] = 'visitor=alice'
+        request.META['HTTP_HOST'] = 'example.com'
+        request.session = {'visitor': 'alice'}
+        self.assertEqual(utils.check_and_read_from_file(request, '/visitor.js'), 'var visitor = null;')
+
+
+class FetchHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    requests = []
+    
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get('If-None-Match')))
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Length', '10')
+        self.end_headers()
+        self.wfile.write('var a = 1;')
+    
+    def log_message(self, *args):
+        pass
+
+
+class FetchTestCase(unittest.TestCase):
+    def setUp(self):
+        FetchHandler.requests = []
+        self.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), FetchHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = 'http://127.0.0.1:%d/remote.js' % self.server.server_port
+    
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+    
+    def test_conditional_get(self):
+        fetcher = fetch.RemoteFetcher(timeout=5)
+        self.assertEqual(fetcher.fetch(self.url), 'var a = 1;')
+        self.assertEqual(fetcher.fetch(self.url), 'var a = 1;')
+        self.assertEqual(FetchHandler.requests, [('/remote.js', None), ('/remote.js', '"v1"')])
+    
+    def test_fetch_error(self):
+        fetcher = fetch.RemoteFetcher(timeout=5)
+        self.assertRaises(fetch.FetchError, fetcher.fetch, 'http://127.0.0.1:1/remote.js')
+
+
+class SlowFetchHandler(FetchHandler):
+    def do_GET(self):
+        time.sleep(0.3)
+        FetchHandler.do_GET(self)
+
+
+class ThreadingHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class ConcurrentFetchTestCase(FetchTestCase):
+    def setUp(self):
+        FetchHandler.requests = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), SlowFetchHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = 'http://127.0.0.1:%d/remote.js' % self.server.server_port
+    
+    def test_read_files(self):
+        filenames = ['%s?%d' % (self.url, i) for i in range(3)]
+        filenames[1:1] = ['index.js']
+        start = time.time()
+        contents = utils.read_files(None, filenames)
+        self.assertTrue(time.time() - start < 0.8)
+        self.assertEqual(contents, ['var a = 1;', utils.check_and_read_from_file(None, 'index.js'),
+                                    'var a = 1;', 'var a = 1;'])
+
+
+class FileIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.paths = [tempfile.mkdtemp(), tempfile.mkdtemp()]
+        for path, filename in ((self.paths[0], 'a.js'), (self.paths[1], 'a.js'),
+                               (self.paths[1], os.path.join('lib', 'b.css'))):
+            if not os.path.isdir(os.path.dirname(os.path.join(path, filename))):
+                os.makedirs(os.path.dirname(os.path.join(path, filename)))
+            open(os.path.join(path, filename), 'w').close()
+    
+    def tearDown(self):
+        for path in self.paths:
+            shutil.rmtree(path)
+    
+    def test_lookup(self):
+        file_index = fileindex.FileIndex(self.paths)
+        self.assertEqual(file_index.lookup('a.js'), os.path.join(self.paths[0], 'a.js'))
+        self.assertEqual(file_index.lookup('lib/b.css'), os.path.join(self.paths[1], 'lib', 'b.css'))
+        self.assertEqual(file_index.lookup('./lib/b.css'), os.path.join(self.paths[1], 'lib', 'b.css'))
+        self.assertEqual(file_index.lookup('lib/../../a.js'), None)
+        self.assertEqual(file_index.lookup('c.js'), None)
+    
+    def test_list(self):
+        file_index = fileindex.FileIndex(self.paths)
+        self.assertEqual(file_index.list(), ['a.js', 'lib/b.css'])
+        self.assertEqual(file_index.list('.css'), ['lib/b.css'])
+    
+    def test_rebuild_on_directory_change(self):
+        file_index = fileindex.FileIndex(self.paths, check_interval=0)
+        self.assertEqual(file_index.lookup('lib/c.js'), None)
+        os.utime(os.path.join(self.paths[1], 'lib'), (0, 0))
+        open(os.path.join(self.paths[1], 'lib', 'c.js'), 'w').close()
+        self.assertEqual(file_index.lookup('lib/c.js'), os.path.join(self.paths[1], 'lib', 'c.js'))
+    
+    def test_no_rebuild_within_check_interval(self):
+        file_index = fileindex.FileIndex(self.paths, check_interval=60)
+        file_index.lookup('a.js')
+        open(os.path.join(self.paths[0], 'c.js'), 'w').close()
+        self.assertEqual(file_index.lookup('c.js'), None)
+        file_index.invalidate()
+        self.assertEqual(file_index.lookup('c.js'), os.path.join(self.paths[0], 'c.js'))
+
+
+class VersionTestCase(unittest.TestCase):
+    def test_files_version(self):
+        version = utils.get_files_version(['index.js', 'main.css'])
+        self.assertEqual(len(version), utils.FILES_VERSION_LENGTH)
+        self.assertEqual(version, utils.get_files_version(['index.js', 'main.css']))
+        self.assertNotEqual(version, utils.get_files_version(['main.css', 'index.js']))
+        self.assertEqual(utils.get_files_version(['missing.js']), None)
+    
+    def test_tag_url_has_version(self):
+        rendered = template.Template('{% load minify_tags %}{% js "index.js" %}').render(template.Context())
+        self.assertTrue('files=index.js&amp;v=%s' % utils.get_files_version(['index.js']) in rendered)
+    
+    def test_immutable_cache_control(self):
+        c = client.Client()
+        version = utils.get_files_version(['index.js'])
+        response = c.get(urlresolvers.reverse('minify_js'), {'files': 'index.js', 'v': version})
+        self.assertTrue('immutable' in response['Cache-Control'])
+        self.assertTrue('max-age=31536000' in response['Cache-Control'])
+        response = c.get(urlresolvers.reverse('minify_js'), {'files': 'index.js', 'v': 'outdated'})
+        self.assertFalse('immutable' in response['Cache-Control'])
+        self.assertTrue('must-revalidate' in response['Cache-Control'])
+
+
+class ConditionalGetTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = client.Client()
+        self.url = urlresolvers.reverse('minify_css')
+    
+    def test_etag(self):
+        response = self.client.get(self.url, {'files': 'main.css'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], '"%s"' % utils.get_files_version(['main.css']))
+        response = self.client.get(self.url, {'files': 'main.css'},
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, '')
+        response = self.client.get(self.url, {'files': 'main.css'},
+                                   HTTP_IF_NONE_MATCH='"outdated"')
+        self.assertEqual(response.status_code, 200)
+    
+    def test_last_modified(self):
+        response = self.client.get(self.url, {'files': 'main.css,libs/reset.css'})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.url, {'files': 'main.css,libs/reset.css'},
+                                   HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+    
+    def test_no_etag_with_url(self):
+        response = self.client.get(urlresolvers.reverse('minify_js'),
+                                   {'files': 'index.js', 'url': urlresolvers.reverse('nominify_css') + '?file=main.css'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class CompressTestCase(unittest.TestCase):
+    def test_choose_encoding(self):
+        self.assertEqual(compress.choose_encoding('gzip, deflate'), 'gzip')
+        self.assertEqual(compress.choose_encoding('deflate, gzip;q=0'), None)
+        self.assertEqual(compress.choose_encoding(''), None)
+        if compress.brotli is not None:
+            self.assertEqual(compress.choose_encoding('gzip, br'), 'br')
+        else:
+            self.assertEqual(compress.choose_encoding('gzip, br'), 'gzip')
+    
+    def test_gzip_response(self):
+        c = client.Client()
+        url = urlresolvers.reverse('minify_js')
+        plain = c.get(url, {'files': 'index.js'})
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertTrue('Accept-Encoding' in plain['Vary'])
+        compressed = c.get(url, {'files': 'index.js'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertTrue('Accept-Encoding' in compressed['Vary'])
+        self.assertNotEqual(compressed['ETag'], plain['ETag'])
+        content = gzip.GzipFile(fileobj=StringIO(compressed.content)).read()
+        self.assertEqual(content, plain.content)
+
+
+class StreamingTestCase(unittest.TestCase):
+    def tearDown(self):
+        app_settings.MINIFY_STREAMING = False
+    
+    def test_iter_minify_from_files(self):
+        files = ['index.js', 'head.load.min.js']
+        chunks = list(utils.iter_minify_js_from_files(None, files))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(''.join(chunks), utils.minify_js_from_files(None, files))
     
+    def test_streaming_response(self):
+        c = client.Client()
+        url = urlresolvers.reverse('minify_js')
+        files = 'index.js,head.load.min.js'
+        content = c.get(url, {'files': files}).content
+        app_settings.MINIFY_STREAMING = True
+        response = c.get(url, {'files': files})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, content)
+
 
+class MappedFileTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.large_js = os.path.join(self.directory, 'large.js')
+        file = open(self.large_js, 'wb')
+        file.write('var a = 1;\r\n\tfoo( a ) ;// comment\n' * (utils.MMAP_MIN_SIZE / 20))
+        file.close()
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    def test_read_from_file(self):
+        content = open(self.large_js, 'rb').read()
+        mapped = utils.read_from_file(self.large_js, mapped=True)
+        self.assertFalse(isinstance(mapped, basestring))
+        self.assertEqual(mapped[:], content)
+        self.assertEqual(utils.read_from_file(self.large_js), content)
+        index_js = os.path.join(app_settings.settings.MEDIA_ROOT, 'js', 'index.js')
+        self.assertTrue(isinstance(utils.read_from_file(index_js, mapped=True), basestring))
+    
+    def test_minify_mapped_file(self):
+        content = open(self.large_js, 'rb').read()
+        mapped = utils.read_from_file(self.large_js, mapped=True)
+        self.assertEqual(jsmin(mapped), jsmin(content))
+        self.assertEqual(cssmin(mapped), cssmin(content))
+        items = [(mapped, utils.minify_js, None), (content, utils.minify_js, None)]
+        self.assertEqual(filecache.cached_minify_many(items), [jsmin(content)] * 2)
+    
+    def test_nominify_file_response(self):
+        c = client.Client()
+        response = c.get(urlresolvers.reverse('nominify_css'), {'file': 'main.css'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, utils.check_and_read_from_file(None, 'main.css'))
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        response = c.get(urlresolvers.reverse('nominify_css'), {'file': 'missing.css'})
+        self.assertEqual(response.content, '')
+
+
+class DevCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'a.js')
+        self.write('var a = 1;', 1000)
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        app_settings.MINIFY_DEV_CACHE = False
+        app_settings.MINIFY_DEBUG_COMBINE = False
+        devcache._dev_cache = None
+    
+    def write(self, content, mtime):
+        file = open(self.path, 'wb')
+        file.write(content)
+        file.close()
+        os.utime(self.path, (mtime, mtime))
+    
+    def test_only_changed_files_are_minified_again(self):
+        calls = []
+        def minifier(content):
+            calls.append(content)
+            return jsmin(content)
+        dev_cache = devcache.DevCache()
+        self.assertEqual(dev_cache.minify(self.path, minifier, 'test'), 'var a=1;')
+        self.assertEqual(dev_cache.minify(self.path, minifier, 'test'), 'var a=1;')
+        self.assertEqual(dev_cache.read(self.path), 'var a = 1;')
+        self.assertEqual(len(calls), 1)
+        self.write('var b = 2;', 2000)
+        self.assertEqual(dev_cache.minify(self.path, minifier, 'test'), 'var b=2;')
+        self.assertEqual(len(calls), 2)
+    
+    def test_get_dev_cache(self):
+        self.assertEqual(devcache.get_dev_cache(), None)
+        app_settings.MINIFY_DEV_CACHE = True
+        self.assertTrue(devcache.get_dev_cache() is devcache.get_dev_cache())
+        self.assertEqual(utils.minify_js_from_files(None, ['index.js', 'head.load.min.js']),
+                         ''.join(utils.iter_minify_js_from_files(None, ['index.js', 'head.load.min.js'])))
+    
+    def test_vlq(self):
+        self.assertEqual([sourcemap.encode_vlq(v) for v in (0, 1, -1, 15, 16, 123)],
+                         ['A', 'C', 'D', 'e', 'gB', '2H'])
+    
+    def test_nominify_bundle(self):
+        files = ['index.js', 'head.load.min.js']
+        content = utils.nominify_bundle(None, 'js', files)
+        combined, comment = content.rsplit('\n', 1)
+        self.assertEqual(combined, utils.nominify_from_files(None, files))
+        prefix = '//# sourceMappingURL=data:application/json;charset=utf-8;base64,'
+        self.assertTrue(comment.startswith(prefix))
+        source_map = simplejson.loads(comment[len(prefix):].decode('base64'))
+        self.assertEqual(source_map['version'], 3)
+        self.assertEqual(source_map['sources'], ['%s?file=%s' % (minify_tags.NOMINIFY_JS_URL, f) for f in files])
+        lines = source_map['mappings'].split(';')
+        first_lines = sourcemap.count_lines(utils.check_and_read_from_file(None, 'index.js'))
+        self.assertEqual(len(lines), combined.count('\n') + 1)
+        self.assertEqual(lines[:2], ['AAAA', 'AACA'])
+        #first line of the second file
+        self.assertEqual(lines[first_lines], 'AC%sA' % sourcemap.encode_vlq(1 - first_lines))
+    
+    def test_combined_debug_tag(self):
+        app_settings.MINIFY_DEBUG_COMBINE = True
+        paths = minify_tags._construct_nominify_paths(minify_tags.NOMINIFY_JS_URL, ['index.js', 'head.load.min.js'])
+        self.assertEqual(paths, ['%s?files=index.js,head.load.min.js' % minify_tags.NOMINIFY_JS_URL])
+        c = client.Client()
+        response = c.get(paths[0])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue('sourceMappingURL' in response.content)
+        response = c.get(paths[0], HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+
+class SourceMapTestCase(unittest.TestCase):
+    def tearDown(self):
+        app_settings.MINIFY_SOURCE_MAPS = False
+    
+    def decode_mappings(self, mappings):
+        values = dict((c, i) for i, c in enumerate(sourcemap._BASE64))
+        decoded = []
+        state = [0, 0, 0, 0]
+        for generated_line, line in enumerate(mappings.split(';')):
+            state[0] = 0
+            for segment in filter(None, line.split(',')):
+                fields = []
+                value = shift = 0
+                for c in segment:
+                    digit = values[c]
+                    value += (digit & 31) << shift
+                    shift += 5
+                    if not digit & 32:
+                        fields.append(value & 1 and -(value >> 1) or value >> 1)
+                        value = shift = 0
+                state = [s + f for s, f in zip(state, fields)]
+                decoded.append((generated_line, state[0], state[1], state[2], state[3]))
+        return decoded
+    
+    def assertMapped(self, generated, sources, mappings):
+        generated_lines = generated.split('\n')
+        source_lines = [source.split('\n') for source in sources]
+        self.assertTrue(mappings)
+        for generated_line, generated_column, source, line, column in mappings:
+            self.assertEqual(generated_lines[generated_line][generated_column],
+                             source_lines[source][line][column])
+    
+    def test_minifier_offsets(self):
+        for minifier, source in ((jsmin, 'var a = 1;\n\n// c\nif ( a ) {\n  a = "b" ;\n}\n'),
+                                 (cssmin, 'a {\n  color : #ffffff ;\n  margin: 0px;\n}\n')):
+            offsets = []
+            minified = minifier(source, offsets)
+            self.assertEqual(minified, minifier(source))
+            for output_offset, input_offset in offsets:
+                self.assertEqual(minified[output_offset], source[input_offset])
+            source_map = sourcemap.SourceMap()
+            source_map.add_offsets(0, source_map.add_source('a', source), minified, source, offsets)
+            self.assertMapped(minified, [source], self.decode_mappings(source_map.mappings()))
+    
+    def test_source_map_view(self):
+        app_settings.MINIFY_SOURCE_MAPS = True
+        c = client.Client()
+        files = 'index.js,jquery/jquery-1.5.1.js'
+        content = c.get(urlresolvers.reverse('minify_js'), {'files': files}).content
+        content, comment = content.rsplit('\n', 1)
+        self.assertTrue(comment.startswith('//# sourceMappingURL=%s?files=%s&v=' % (
+            urlresolvers.reverse('minify_js_map'), files)))
+        response = c.get(comment.split('=', 1)[1])
+        self.assertEqual(response.status_code, 200)
+        source_map = simplejson.loads(response.content)
+        self.assertEqual(source_map['sources'], ['%s?file=%s' % (minify_tags.NOMINIFY_JS_URL, f)
+                                                 for f in files.split(',')])
+        sources = [source.encode('utf-8') for source in source_map['sourcesContent']]
+        self.assertMapped(content, sources, self.decode_mappings(source_map['mappings']))
+        css = c.get(urlresolvers.reverse('minify_css'), {'files': 'main.css'}).content
+        self.assertTrue(css.endswith(' */'))
+
+
+class BundleCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        bundlecache.reset_stats()
+    
+    def test_normalized_key(self):
+        self.assertEqual(bundlecache.normalize_files([' index.js', '', 'main.css ']), ['index.js', 'main.css'])
+        key = bundlecache.bundle_key('js', ['index.js', 'head.load.min.js'])
+        self.assertEqual(key, bundlecache.bundle_key('js', ['index.js ', ' head.load.min.js', '']))
+        self.assertNotEqual(key, bundlecache.bundle_key('js', ['head.load.min.js', 'index.js']))
+        self.assertNotEqual(key, bundlecache.bundle_key('css', ['index.js', 'head.load.min.js']))
+        self.assertNotEqual(bundlecache.bundle_key('js', ['/media/js/index.js'], '/url/'),
+                            bundlecache.bundle_key('js', ['/media/js/index.js']))
+    
+    def test_bundle_cache_shared_by_query_strings(self):
+        cache.delete(bundlecache.bundle_key('js', ['index.js', 'head.load.min.js']))
+        c = client.Client()
+        url = urlresolvers.reverse('minify_js')
+        first = c.get(url, {'files': 'index.js,head.load.min.js'})
+        second = c.get(url, {'files': 'index.js, head.load.min.js', 'utm_source': 'mail'})
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(bundlecache.get_stats(), {'hits': 1, 'misses': 1})
+        calls = []
+        content = bundlecache.get_bundle('js', ['index.js', 'head.load.min.js'], lambda: calls.append(1))
+        self.assertEqual(calls, [])
+        self.assertEqual(content, first.content)
+    
+    def test_warm_bundles(self):
+        bundle_list = [('js', ('index.js', 'head.load.min.js')), ('css', ('main.css',)),
+                       ('less', ('main.css',)), ('js', ('index.js', '/visitor.js'))]
+        for kind, files in bundle_list:
+            cache.delete(bundlecache.bundle_key(kind, files))
+        results = bundlecache.warm_bundles(bundle_list, executors.SerialExecutor())
+        self.assertEqual([r[:2] for r in results], bundle_list)
+        self.assertEqual([r[4] is None for r in results], [True, True, False, False])
+        self.assertEqual(results[3][4], bundlecache.NOT_CACHEABLE)
+        self.assertEqual(cache.get(bundlecache.bundle_key(*bundle_list[3])), None)
+        c = client.Client()
+        response = c.get(urlresolvers.reverse('minify_js'), {'files': 'index.js,head.load.min.js'})
+        self.assertEqual(results[0][3], len(response.content))
+        response = c.get(urlresolvers.reverse('minify_css'), {'files': 'main.css'})
+        self.assertEqual(results[1][3], len(response.content))
+        self.assertEqual(bundlecache.get_stats(), {'hits': 2, 'misses': 0})
+    
+    def test_minify_warm_command(self):
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = StringIO(), StringIO()
+        try:
+            management.call_command('minify_warm')
+            output = sys.stdout.getvalue()
+            errors = sys.stderr.getvalue()
+        finally:
+            sys.stdout, sys.stderr = stdout, stderr
+        self.assertTrue('not cacheable' in output.splitlines()[-1])
+        #the tests use the locmem backend
+        self.assertTrue('locmem' in errors)
+
+
+class StampedeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.files = ['stampede-%s.js' % id(self)]
+        self.key = bundlecache.bundle_key('js', self.files)
+        self.lock_timeout = app_settings.MINIFY_LOCK_TIMEOUT
+    
+    def tearDown(self):
+        app_settings.MINIFY_LOCK_TIMEOUT = self.lock_timeout
+        for key in (self.key, '%s:lock' % self.key, bundlecache._latest_key('js', self.files)):
+            cache.delete(key)
+    
+    def test_single_flight(self):
+        calls = []
+        def build():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'built'
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            bundlecache.get_bundle('js', self.files, build))) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, ['built'] * 5)
+    
+    def test_other_process_building(self):
+        cache.add('%s:lock' % self.key, 1, 30)
+        cache.set(bundlecache._latest_key('js', self.files), 'minify:test:old')
+        cache.set('minify:test:old', 'old')
+        self.assertEqual(bundlecache.get_bundle_or_stale('js', self.files, lambda: 'new'), ('old', True))
+        #waits for the other process
+        timer = threading.Timer(0.1, lambda: cache.set(self.key, 'other'))
+        timer.start()
+        self.assertEqual(bundlecache.get_bundle('js', self.files, lambda: 'new'), 'other')
+        timer.join()
+        #builds it anyway when the lock timed out
+        cache.delete(self.key)
+        app_settings.MINIFY_LOCK_TIMEOUT = 0.1
+        self.assertEqual(bundlecache.get_bundle('js', self.files, lambda: 'new'), 'new')
+        cache.delete('minify:test:old')
+
+
+class InstrumentationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.counters = instrumentation.Counters()
+        self.counters.connect()
+    
+    def tearDown(self):
+        self.counters.disconnect()
+    
+    def test_timings(self):
+        timings = []
+        minified = filecache.cached_minify_many([('a  =  1;', jsmin, None), ('a  =  1;', jsmin, None), ('', jsmin, None)],
+                                                executors.SerialExecutor(), timings)
+        self.assertEqual(minified, ['a=1;', 'a=1;', ''])
+        self.assertEqual([cached for seconds, cached in timings], [False, True, False])
+    
+    def test_signals(self):
+        files = ['index.js', 'head.load.min.js']
+        cache.delete(bundlecache.bundle_key('js', files))
+        served = []
+        def receiver(sender, **kwargs):
+            served.append((sender, kwargs['files'], kwargs['size'], kwargs['cached']))
+        signals.bundle_served.connect(receiver)
+        try:
+            c = client.Client()
+            url = urlresolvers.reverse('minify_js')
+            first = c.get(url, {'files': ','.join(files)})
+            second = c.get(url, {'files': ','.join(files)})
+        finally:
+            signals.bundle_served.disconnect(receiver)
+        self.assertEqual(served, [('js', files, len(first.content), False),
+                                  ('js', files, len(second.content), True)])
+        totals = self.counters.get()
+        self.assertEqual(totals['file_read']['count'], 2)
+        self.assertEqual(totals['file_minified']['count'], 2)
+        self.assertTrue(totals['file_minified']['minified_size'] <= totals['file_minified']['size'])
+        self.assertEqual(totals['bundle_built']['count'], 1)
+        self.assertEqual((totals['bundle_served']['hits'], totals['bundle_served']['misses']), (1, 1))
+        self.counters.reset()
+        self.assertEqual(self.counters.get(), {})
+
+
+class InlineTestCase(unittest.TestCase):
+    def setUp(self):
+        bundlecache.reset_stats()
+    
+    def render(self, tag):
+        return template.Template('{% load minify_tags %}' + tag).render(template.Context())
+    
+    def test_inline_css(self):
+        cache.delete(bundlecache.bundle_key('css', ['main.css']))
+        rendered = self.render('{% css "main.css" "inline" %}')
+        self.assertTrue('<style type="text/css">%s</style>' % utils.minify_css_from_files(None, ['main.css']) in rendered)
+        self.assertFalse('<link' in rendered)
+        self.render('{% css "main.css" "inline" %}')
+        self.assertEqual(bundlecache.get_stats(), {'hits': 0, 'misses': 1})
+        minify_tags.clear_rendered()
+        self.render('{% css "main.css" "inline" %}')
+        self.assertEqual(bundlecache.get_stats(), {'hits': 1, 'misses': 1})
+    
+    def test_inline_threshold(self):
+        minified = utils.minify_js_from_files(None, ['index.js'])
+        rendered = self.render('{% js "index.js" "" 10 %}')
+        self.assertTrue('%s?files=index.js' % minify_tags.MINIFY_JS_URL in rendered)
+        self.assertFalse(minified in rendered)
+        rendered = self.render('{% js "index.js" "" 10000 %}')
+        self.assertFalse('%s?files=index.js' % minify_tags.MINIFY_JS_URL in rendered)
+        self.assertTrue(minified in rendered)
+    
+    def test_invalid_argument(self):
+        self.assertRaises(template.TemplateSyntaxError, template.Template,
+                          '{% load minify_tags %}{% css "main.css" "inlined" %}')
+        self.assertRaises(template.TemplateSyntaxError, template.Template,
+                          '{% load minify_tags %}{% js "index.js" "" "2k" %}')
+        context = template.Context({'inline': 'inlined'})
+        rendered = template.Template('{% load minify_tags %}{% css "main.css" inline %}').render(context)
+        self.assertTrue('<link' in rendered)
+    
+    def test_closing_tags_escaped(self):
+        self.assertEqual(minify_tags.InlineBundle('js', 'a="</SCRIPT>"').content, 'a="<\\/SCRIPT>"')
+        self.assertEqual(minify_tags.InlineBundle('css', 'a{content:"</style>"}').content, 'a{content:"<\\/style>"}')
+    
+    def test_find_inline_tags(self):
+        template_dir = tempfile.mkdtemp()
+        try:
+            page = open(os.path.join(template_dir, 'page.html'), 'w')
+            page.write('{% css "main.css" "inline" %}{% js "index.js" "" 2048 %}')
+            page.close()
+            self.assertEqual(bundles.find_template_tags([template_dir]),
+                             [('css', 'main.css', None), ('js', 'index.js', None)])
+        finally:
+            shutil.rmtree(template_dir)
+
+
+class DynamicTestCase(unittest.TestCase):
+    def setUp(self):
+        from sample_app import views
+        self.config = views.CONFIG
+        self.saved = dict(self.config)
+        self.client = client.Client()
+        self.url = urlresolvers.reverse('minify_js')
+        bundlecache.reset_stats()
+    
+    def tearDown(self):
+        self.config.update(self.saved)
+    
+    def test_cacheable(self):
+        self.assertTrue(dynamic.is_cacheable('/config.js?a=1'))
+        self.assertFalse(dynamic.is_cacheable(urlresolvers.reverse('nominify_css')))
+        self.assertFalse(dynamic.is_cacheable('/missing/'))
+    
+    def test_cached_output(self):
+        self.config['version'] = 'test-%s' % time.time()
+        cache.delete(bundlecache.bundle_key('js', ['index.js']))
+        first = self.client.get(self.url, {'files': 'index.js', 'url': '/config.js'})
+        self.assertTrue('var config={' in first.content)
+        self.assertTrue(first.content.endswith(utils.minify_js_from_files(None, ['index.js'])))
+        #cached until the version changes
+        self.config['debug'] = True
+        second = self.client.get(self.url, {'files': 'index.js', 'url': '/config.js'})
+        self.assertEqual(second.content, first.content)
+        self.config['version'] += '-2'
+        third = self.client.get(self.url, {'files': 'index.js', 'url': '/config.js'})
+        self.assertTrue('"debug":true' in third.content)
+        #the files were only minified for the first request
+        self.assertEqual(bundlecache.get_stats(), {'hits': 2, 'misses': 1})
+    
+    def test_cache_key(self):
+        request = http.HttpRequest()
+        request.GET = http.QueryDict('')
+        options = (None, lambda request: u'fran\xe7ais', lambda request: 42)
+        key = dynamic.cache_key(request, u'/config.js?q=\u20ac', options)
+        self.assertTrue(key.startswith('%s:' % dynamic.KEY_PREFIX))
+        self.assertEqual(key, dynamic.cache_key(request, '/config.js?q=\xe2\x82\xac',
+                                                (None, lambda request: 'fran\xc3\xa7ais',
+                                                 lambda request: '42')))
+        self.assertNotEqual(key, dynamic.cache_key(request, u'/config.js?q=\u20ac',
+                                                   (None, options[1], lambda request: 43)))
+    
+    def test_request_parameters(self):
+        self.config['version'] = 'test-%s' % time.time()
+        first = self.client.get(self.url, {'url': '/config.js', 'debug': '1'})
+        self.config['debug'] = True
+        #the view may read the other parameters of the request
+        second = self.client.get(self.url, {'url': '/config.js', 'debug': '2'})
+        self.assertNotEqual(second.content, first.content)
+        self.assertEqual(self.client.get(self.url, {'url': '/config.js', 'debug': '1'}).content,
+                         first.content)
+    
+    def test_not_cacheable(self):
+        self.assertFalse(dynamic.is_cacheable('/visitor.js'))
+        for params in ({'files': 'index.js', 'url': '/visitor.js'},
+                       {'url': '/visitor.js'}):
+            alice = client.Client()
+            alice.cookies['visitor'] = 'alice'
+            bob = client.Client()
+            bob.cookies['visitor'] = 'bob'
+            self.assertTrue('"alice"' in alice.get(self.url, params).content)
+            content = bob.get(self.url, params).content
+            self.assertTrue('"bob"' in content)
+            self.assertFalse('"alice"' in content)
+        #view paths within files are read anonymously
+        alice = client.Client()
+        alice.cookies['visitor'] = 'alice'
+        content = alice.get(self.url, {'files': 'index.js,/visitor.js'}).content
+        self.assertTrue('var visitor=null;' in content)
+        self.assertEqual(bundlecache.get_stats(), {'hits': 0, 'misses': 0})
+    
+    def test_url_parameters(self):
+        request = http.HttpRequest()
+        request.GET = http.QueryDict('files=index.js&url=/config.js%3Fa%3Db%3Dc')
+        self.assertTrue(utils.minify_js_from_url(request, '/config.js?a=b=c'))
+        self.assertFalse('a' in request.GET)
+
+
+class SplittingTestCase(unittest.TestCase):
+    def tearDown(self):
+        app_settings.MINIFY_SPLIT_BUNDLES = False
+        splitting._plan = None
+    
+    def test_split_bundles(self):
+        bundle_list = [
+            ('js', ('jquery.js', 'ui.js', 'home.js')),
+            ('js', ('jquery.js', 'ui.js', 'shop.js', 'cart.js')),
+            ('js', ('jquery.js', 'blog.js')),
+            ('css', ('reset.css', 'home.css')),
+            ('css', ('reset.css', 'shop.css')),
+        ]
+        plan = splitting.split_bundles(bundle_list)
+        self.assertEqual(plan[bundle_list[0]], [('jquery.js',), ('ui.js',), ('home.js',)])
+        self.assertEqual(plan[bundle_list[1]], [('jquery.js',), ('ui.js',), ('shop.js', 'cart.js')])
+        self.assertEqual(plan[bundle_list[2]], [('jquery.js',), ('blog.js',)])
+        self.assertEqual(plan[bundle_list[3]], [('reset.css',), ('home.css',)])
+        self.assertEqual(splitting.find_chunks(bundle_list[:2]),
+                         [('js', ('jquery.js', 'ui.js')), ('js', ('home.js',)), ('js', ('shop.js', 'cart.js'))])
+    
+    def test_order_kept(self):
+        bundle_list = [('js', ('a.js', 'b.js', 'c.js')), ('js', ('b.js', 'a.js', 'c.js'))]
+        plan = splitting.split_bundles(bundle_list)
+        self.assertEqual(plan[bundle_list[0]], [('a.js',), ('b.js',), ('c.js',)])
+        self.assertEqual(plan[bundle_list[1]], [('b.js',), ('a.js',), ('c.js',)])
+    
+    def test_tags_point_to_chunks(self):
+        app_settings.MINIFY_SPLIT_BUNDLES = True
+        splitting._plan = splitting.split_bundles([('js', ('index.js', 'head.load.min.js')),
+                                                   ('js', ('index.js',))])
+        rendered = template.Template('{% load minify_tags %}{% js "index.js,head.load.min.js" %}').render(template.Context())
+        self.assertTrue('files=index.js&' in rendered)
+        self.assertTrue('files=head.load.min.js&' in rendered)
+    
+    def test_minify_chunks_command(self):
+        stdout = sys.stdout
+        sys.stdout = StringIO()
+        try:
+            management.call_command('minify_chunks')
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+        self.assertTrue('chunks' in output.splitlines()[-1])
+
+
+class RenderCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        minify_tags.clear_rendered()
+    
+    def render(self, tag):
+        return template.Template('{% load minify_tags %}' + tag).render(template.Context())
+    
+    def test_rendered_once_per_version(self):
+        rendered = self.render('{% css "main.css" %}')
+        self.assertEqual(len(minify_tags._rendered), 1)
+        key, (checked, versions, output) = minify_tags._rendered.items()[0]
+        self.assertEqual(versions, (utils.get_files_version(['main.css']),))
+        minify_tags._rendered[key] = (checked, versions, 'kept')
+        self.assertEqual(self.render('{% css "main.css" %}'), 'kept')
+        #checked again, the version didn't change
+        minify_tags._rendered[key] = (0, versions, 'kept')
+        self.assertEqual(self.render('{% css "main.css" %}'), 'kept')
+        minify_tags._rendered[key] = (0, ('outdated',), 'kept')
+        self.assertEqual(self.render('{% css "main.css" %}'), rendered)
+    
+    def test_not_on_disk(self):
+        self.render('{% js "index.js,/visitor.js" %}')
+        self.render('{% css "http://example.com/remote.css" %}')
+        self.assertEqual(minify_tags._rendered, {})
+    
+    def test_arguments(self):
+        context = template.Context({'files': 'index.js'})
+        rendered = template.Template('{% load minify_tags %}{% js files %}').render(context)
+        self.assertTrue('files=index.js' in rendered)
+        self.assertRaises(template.TemplateSyntaxError, template.Template,
+                          '{% load minify_tags %}{% css "main.css" "inline" "more" %}')
+
+
+class StartupTestCase(unittest.TestCase):
+    def test_urls_reversed_lazily(self):
+        minify_tags._urls.clear()
+        self.assertEqual('%s' % minify_tags.MINIFY_JS_URL, urlresolvers.reverse('minify_js'))
+        self.assertEqual(minify_tags._urls.values(), [urlresolvers.reverse('minify_js')])
+        self.assertEqual('%s?file=main.css' % minify_tags.NOMINIFY_CSS_URL,
+                         '%s?file=main.css' % urlresolvers.reverse('nominify_css'))
+    
+    def test_import_cost(self):
+        #a fresh interpreter, modules imported by the test runner don't count
+        script = ('import sys; import minify.utils; '
+                  'print " ".join(sorted(set(["httplib", "multiprocessing"]) & set(sys.modules)))')
+        output = subprocess.Popen([sys.executable, '-c', script], stdout=subprocess.PIPE,
+                                  env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))).communicate()[0]
+        self.assertEqual(output.strip(), '')
@@ -9,6 +9,8 @@ from minify import views
 urlpatterns = patterns('',    
     url(r'^js/$', views.js_minify, name='minify_js'),
     url(r'^css/$', views.css_minify, name='minify_css'),
+    url(r'^js/map/$', views.js_source_map, name='minify_js_map'),
+    url(r'^css/map/$', views.css_source_map, name='minify_css_map'),
     url(r'^js2/$', views.js_nominify, name='nominify_js'),
     url(r'^css2/$', views.css_nominify, name='nominify_css'),
 )
\ No newline at end of file
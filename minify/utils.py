@@ -2,22 +2,44 @@
 Utility functions used to handle minifying
 """
 
+import copy
+import hashlib
+import mmap
 import os
-import urllib2
+import time
+import urllib
 
+from django import http
 from django.core import urlresolvers
 
-from jsmin import jsmin
+from jsmin import jsmin, VERSION as JSMIN_VERSION
+from cssmin import cssmin, VERSION as CSSMIN_VERSION
 
 from minify import app_settings
+from minify import devcache
+from minify import dynamic
+from minify import executors
+from minify import fileindex
+from minify import filecache
+from minify import instrumentation
+from minify import signals
+from minify import sourcemap
 
 MINIFY_PATHS = app_settings.MINIFY_PATHS
+JS_VERSION = 'jsmin-%s' % JSMIN_VERSION
+CSS_VERSION = 'cssmin-%s' % CSSMIN_VERSION
+FILES_VERSION_LENGTH = 12
+#the META of the request of a page passed on to the views a bundle reads
+VIEW_REQUEST_META = ('HTTP_HOST', 'SERVER_NAME', 'SERVER_PORT', 'wsgi.url_scheme')
+#smaller files are read, mapping them costs more than copying them
+MMAP_MIN_SIZE = 64 * 1024
 
 
 def find_in_path(filename):
     """Utility function which is checking for given
     filename (with given subdirectories like "js/jquery.js")
-    within in ``app_settings.MINIFY_PATHS``.
+    within in ``app_settings.MINIFY_PATHS``, using the index
+    of ``minify.fileindex`` instead of checking the file system.
     
     Params:
         - ``filename``: the name of the file which is a relative
@@ -28,57 +50,277 @@ def find_in_path(filename):
           of the file within the file system
         - on failure: ``None``
     """
-    for minify_path in MINIFY_PATHS:
-        path = os.path.join(minify_path, filename)
-        if os.path.exists(path) and os.path.isfile(path):
-            return path
-    return None
+    return fileindex.get_file_index().lookup(filename)
 
-def read_from_file(file_path):
+def read_from_file(file_path, mapped=False):
     """Utility function to read a file from
     a given absolute path.
     
     Params:
         - ``file_path``: the absolute path of the file
+        - ``mapped`` (optional): a flag if a file of at least
+          ``MMAP_MIN_SIZE`` bytes should be memory mapped instead
+          of copied into a string
+    
+    Returns:
+    - the content of the file, a read only ``mmap.mmap`` object
+      for a mapped file
+    """
+    file = open(file_path, 'rb')
+    try:
+        if mapped and os.fstat(file.fileno()).st_size >= MMAP_MIN_SIZE:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return file.read()
+    finally:
+        file.close()
+
+def find_in_url_roots(url):
+    """Utility function mapping a url below ``STATIC_URL`` or
+    ``MEDIA_URL`` to a file within ``STATIC_ROOT`` or ``MEDIA_ROOT``.
+    
+    Params:
+        - ``url``: a url path like ``'/media/js/base.js'`` or a full url
+    
+    Returns:
+        - on success: the absolute path of the existing file
+        - on failure: ``None``
+    """
+    path = url.split('?')[0]
+    for url_setting, root_setting in (('STATIC_URL', 'STATIC_ROOT'), ('MEDIA_URL', 'MEDIA_ROOT')):
+        base_url = getattr(app_settings.settings, url_setting, None)
+        root = getattr(app_settings.settings, root_setting, None)
+        if not base_url or not root or not path.startswith(base_url):
+            continue
+        root = os.path.abspath(root)
+        file_path = os.path.normpath(os.path.join(root, urllib.unquote(path[len(base_url):])))
+        if file_path.startswith(root + os.sep) and os.path.isfile(file_path):
+            return file_path
+    return None
+
+def read_from_view(request, url):
+    """Utility function which resolves a url path to one of the
+    project's views and returns the content of its response, without
+    going through HTTP.
+    
+    Params:
+        - ``request``: a ``django.http.HttpRequest object`` or ``None``
+        - ``url``: a url path, optionally with a query string
     
     Returns:
-    - the content of the file
+        - on success: content of the response
+        - on failure: empty string ''
     """
-    file = open(file_path, 'r')
-    file_content = file.read()
-    file.close()
-    return file_content
+    path, _, query_string = url.partition('?')
+    try:
+        view, args, kwargs = urlresolvers.resolve(path)
+    except http.Http404:
+        return ''
+    #an anonymous request like the HTTP request it replaces, the view
+    #must not see the cookies, session or user of the caller
+    view_request = http.HttpRequest()
+    view_request.method = 'GET'
+    if request is not None:
+        for name in VIEW_REQUEST_META:
+            if name in request.META:
+                view_request.META[name] = request.META[name]
+    view_request.path = view_request.path_info = path
+    view_request.GET = http.QueryDict(query_string)
+    try:
+        response = view(view_request, *args, **kwargs)
+    except http.Http404:
+        return ''
+    if response.status_code != 200:
+        return ''
+    return response.content
 
-def check_and_read_from_file(request, filename):
+def check_and_read_from_file(request, filename, mapped=False):
     """Utility function which combine find_in_path
     and read_from_file functions. It first checks if
     a path for given filename exists and returns its
     absolute path. Then it reads the file and returns
     its content.
-    If a given path starts with a '/' or points to a
-    url via 'http://' the file content will be loaded
-    using urllib2.urlopen.
+    If a given path starts with a '/' it is read from
+    ``STATIC_ROOT`` or ``MEDIA_ROOT`` if it is below ``STATIC_URL``
+    or ``MEDIA_URL``, otherwise from the response of the view the
+    path resolves to. Remote urls ('http://' or 'https://') are
+    fetched with ``minify.fetch``.
     
     Params:
         - ``request``: a ``django.http.HttpRequest object``
         - ``filename``: relative file path within ``app_settings.MINIFY_PATHS``
+        - ``mapped`` (optional): a flag if large files on disk should
+          be memory mapped, see ``read_from_file``
     
     Returns:
         - on success: content of the file
         - on failure: empty string ''
     """
-    if filename.startswith('/') or filename.startswith('http://'):
-        if filename.startswith('/'):
-            filename = 'http://%s%s' % (request.get_host(), filename)
-        opener = urllib2.urlopen(filename)
-        return opener.read()
+    start = time.time()
+    if filename.startswith('/') or filename.startswith('http://') or filename.startswith('https://'):
+        file_path = find_in_url_roots(filename)
+        if file_path is not None:
+            source, content = 'root', _read_file(file_path, mapped)
+        elif filename.startswith('/'):
+            source, content = 'view', read_from_view(request, filename)
+        else:
+            #httplib and ssl are only imported by processes fetching files
+            from minify import fetch
+            source, content = 'remote', fetch.get_fetcher().fetch(filename)
     else:
         file_path = find_in_path(filename)
-        if file_path is not None:
-            return read_from_file(file_path)
-    return ''
+        if file_path is None:
+            return ''
+        source, content = 'path', _read_file(file_path, mapped)
+    signals.file_read.send(sender=None, filename=filename, source=source,
+                           seconds=time.time() - start, size=len(content))
+    return content
+
+def _is_remote(filename):
+    """Returns ``True`` if a file given like in ``check_and_read_from_file``
+    is fetched from another host"""
+    return (filename.startswith('http://') or filename.startswith('https://')) and \
+        find_in_url_roots(filename) is None
+
+def read_files(request, filenames, mapped=False):
+    """Utility function reading several files like
+    ``check_and_read_from_file``. Remote files are fetched concurrently
+    by the threads of ``executors.get_fetch_executor``, while the other
+    files are read in the current thread (views might use its database
+    connection), so a slow remote file only delays the bundle by its
+    own time.
+    
+    Params:
+        - ``request``: a ``django.http.HttpRequest object``
+        - ``filenames``: a list of relative file paths within
+          ``app_settings.MINIFY_PATHS`` or urls
+        - ``mapped`` (optional): a flag if large files on disk should
+          be memory mapped, see ``read_from_file``
+    
+    Returns:
+        - a list of the contents of the files in their order
+    """
+    fetch_executor = executors.get_fetch_executor()
+    remote = {}
+    if fetch_executor is not None:
+        for filename in filenames:
+            if filename not in remote and _is_remote(filename):
+                remote[filename] = None
+    if len(remote) < 2:
+        return [check_and_read_from_file(request, filename, mapped) for filename in filenames]
+    for filename in remote:
+        remote[filename] = fetch_executor.submit(check_and_read_from_file, request, filename, mapped)
+    contents = []
+    for filename in filenames:
+        if filename in remote:
+            contents.append(None)
+        else:
+            contents.append(check_and_read_from_file(request, filename, mapped))
+    for index, filename in enumerate(filenames):
+        if filename in remote:
+            contents[index] = remote[filename].get()
+    return contents
+
+def _read_file(file_path, mapped):
+    """Reads a file on disk from the dev cache if it is on"""
+    dev_cache = devcache.get_dev_cache()
+    if dev_cache is not None:
+        return dev_cache.read(file_path)
+    return read_from_file(file_path, mapped)
+
+def get_file_path(filename):
+    """Utility function returning the absolute path of a file
+    given like in ``check_and_read_from_file``, if it is a file
+    on disk.
+    
+    Params:
+        - ``filename``: relative file path within ``app_settings.MINIFY_PATHS``
+          or a url
+    
+    Returns:
+        - on success: the absolute path of the file
+        - on failure: ``None``
+    """
+    if filename.startswith('/') or filename.startswith('http://') or filename.startswith('https://'):
+        return find_in_url_roots(filename)
+    return find_in_path(filename)
+
+_file_digests = {}
+
+def get_file_digest(filename):
+    """Utility function returning the SHA-1 hash of the content
+    of a file on disk. It is only computed again when the modification
+    time or size of the file changed, which is checked at most every
+    ``app_settings.MINIFY_INDEX_CHECK_INTERVAL`` seconds.
+    
+    Params:
+        - ``filename``: relative file path within ``app_settings.MINIFY_PATHS``
+          or a url
+    
+    Returns:
+        - on success: the hex digest of the file content
+        - on failure: ``None`` if it is not a file on disk
+    """
+    now = time.time()
+    cached = _file_digests.get(filename)
+    if cached is not None and now - cached[0] < app_settings.MINIFY_INDEX_CHECK_INTERVAL:
+        return cached[2]
+    file_path = get_file_path(filename)
+    if file_path is None:
+        return None
+    stat = os.stat(file_path)
+    signature = (file_path, stat.st_mtime, stat.st_size)
+    if cached is not None and cached[1] == signature:
+        digest = cached[2]
+    else:
+        digest = hashlib.sha1(read_from_file(file_path, mapped=True)).hexdigest()
+    _file_digests[filename] = (now, signature, digest)
+    return digest
+
+def get_files_version(filenames):
+    """Utility function returning a short digest of the content
+    of the given files and the minifier versions, which changes
+    whenever the minified and combined content of them changes.
+    
+    Params:
+        - ``filenames``: a list of relative filenames within
+           ``app_settings.MINIFY_PATHS``
+    
+    Returns:
+        - on success: the digest
+        - on failure: ``None`` if one of the files is not a file on disk
+    """
+    digests = [JS_VERSION, CSS_VERSION]
+    for filename in filenames:
+        if filename:
+            digest = get_file_digest(filename)
+            if digest is None:
+                return None
+            digests.append(digest)
+    return hashlib.sha1(' '.join(digests)).hexdigest()[:FILES_VERSION_LENGTH]
+
+def get_files_last_modified(filenames):
+    """Utility function returning the newest modification time
+    of the given files.
+    
+    Params:
+        - ``filenames``: a list of relative filenames within
+           ``app_settings.MINIFY_PATHS``
+    
+    Returns:
+        - on success: the modification time in seconds since the epoch
+        - on failure: ``None`` if one of the files is not a file on disk
+    """
+    last_modified = None
+    for filename in filenames:
+        if filename:
+            if get_file_digest(filename) is None:
+                return None
+            mtime = _file_digests[filename][1][1]
+            if last_modified is None or mtime > last_modified:
+                last_modified = mtime
+    return last_modified
 
-def minify_from_files(request, filenames, minifier):
+def minify_from_files(request, filenames, minifier, version=None):
     """Utility function to minify and combine a
     list of relative filenames within ``app_settings.MINIFY_PATHS``
     
@@ -87,16 +329,93 @@ def minify_from_files(request, filenames, minifier):
         - ``filenames``: a list of relative filenames within
            ``app_settings.MINIFY_PATHS``
          - ``minifier``: the function which is used to minify the content
+         - ``version`` (optional): identifies the minifier and its version,
+           if given the minified content of each file is cached
      
      Returns:
         - a the combined and minified content of files from filenames
     """
-    minified_content = []
-    for filename in filenames:
-        file_content = check_and_read_from_file(request, filename)
-        minified_content.append(minifier(file_content))
+    if devcache.get_dev_cache() is not None:
+        return '\n'.join([_minify_file(request, filename, minifier, version)
+                          for filename in filenames])
+    items = [(content, minifier, version)
+             for content in read_files(request, filenames, mapped=True)]
+    timings = []
+    minified_content = filecache.cached_minify_many(items, executors.get_executor(), timings)
+    _send_file_minified(filenames, items, minified_content, timings)
     return '\n'.join(minified_content)
 
+def _send_file_minified(filenames, items, minified_content, timings):
+    """Sends ``signals.file_minified`` for the results of
+    ``filecache.cached_minify_many``"""
+    if not signals.file_minified.receivers:
+        return
+    for filename, (content, minifier, version), minified, (seconds, cached) in \
+            zip(filenames, items, minified_content, timings):
+        signals.file_minified.send(sender=None, filename=filename, version=version,
+                                   seconds=seconds, size=len(content),
+                                   minified_size=len(minified), cached=cached)
+
+def _minify_file(request, filename, minifier, version):
+    """Minifies a single file, from the dev cache if it is on
+    and the file is on disk, otherwise from the file cache."""
+    #the minifier is only called if the content isn't cached
+    calls = []
+    def timed_minifier(content):
+        start = time.time()
+        minified = minifier(content)
+        calls.append((len(content), time.time() - start))
+        return minified
+    dev_cache = devcache.get_dev_cache()
+    file_path = None
+    if dev_cache is not None and version is not None:
+        file_path = get_file_path(filename)
+    if file_path is not None:
+        #the dev cache doesn't tell the size of cached files
+        size = None
+        minified = dev_cache.minify(file_path, timed_minifier, version)
+    else:
+        file_content = check_and_read_from_file(request, filename, mapped=True)
+        size = len(file_content)
+        minified = filecache.cached_minify(file_content, timed_minifier, version)
+    seconds = 0.0
+    if calls:
+        size, seconds = calls[0]
+    signals.file_minified.send(sender=None, filename=filename, version=version,
+                               seconds=seconds, size=size,
+                               minified_size=len(minified), cached=not calls)
+    return minified
+
+def iter_minify_from_files(request, filenames, minifier, version=None):
+    """Generator version of ``minify_from_files`` reading and
+    minifying one file at a time, yielding the minified content
+    of each file and the newlines between them. The minified content
+    is stored in the per file cache as soon as it is yielded.
+    
+    Params:
+        - ``request``: a ``django.http.HttpRequest object``
+        - ``filenames``: a list of relative filenames within
+           ``app_settings.MINIFY_PATHS``
+         - ``minifier``: the function which is used to minify the content
+         - ``version`` (optional): identifies the minifier and its version,
+           if given the minified content of each file is cached
+     
+     Returns:
+        - an iterator over the combined and minified content
+    """
+    for index, filename in enumerate(filenames):
+        if index:
+            yield '\n'
+        yield _minify_file(request, filename, minifier, version)
+
+def iter_minify_js_from_files(request, filenames):
+    """Generator version of ``minify_js_from_files``"""
+    return iter_minify_from_files(request, filenames, minifier=minify_js, version=JS_VERSION)
+
+def iter_minify_css_from_files(request, filenames):
+    """Generator version of ``minify_css_from_files``"""
+    return iter_minify_from_files(request, filenames, minifier=minify_css, version=CSS_VERSION)
+
 def minify_js_from_files(request, filenames):
     """Minify and combine Javascript file content from
     given filenames.
@@ -109,7 +428,7 @@ def minify_js_from_files(request, filenames):
     Returns:
         - minified and combined content from Javascript files
     """
-    return minify_from_files(request, filenames, minifier=minify_js)
+    return minify_from_files(request, filenames, minifier=minify_js, version=JS_VERSION)
 
 def minify_css_from_files(request, filenames):
     """Minify and combine CSS file content from
@@ -123,19 +442,53 @@ def minify_css_from_files(request, filenames):
     Returns:
         - minified and combined content from CSS files
     """
-    return minify_from_files(request, filenames, minifier=minify_css)
+    return minify_from_files(request, filenames, minifier=minify_css, version=CSS_VERSION)
 
-def minify_js(file_content):
+def minify_bundles(request, bundles, executor=None):
+    """Minify and combine several bundles at once, the files of
+    all bundles are minified concurrently if the executor allows it.
+    
+    Params:
+        - ``request``: a django.http.HttpRequest object
+        - ``bundles``: a list of ``(kind, filenames)`` tuples, ``kind``
+          being ``'js'`` or ``'css'``
+        - ``executor`` (optional): an executor from ``minify.executors``,
+          defaults to the one configured by ``app_settings.MINIFY_EXECUTOR``
+    
+    Returns:
+        - a list of the minified and combined content of each bundle
+    """
+    items = []
+    contents = read_files(request, [filename for kind, filenames in bundles for filename in filenames],
+                          mapped=True)
+    for kind, filenames in bundles:
+        minifier, version = MINIFIERS[kind]
+        for filename in filenames:
+            items.append((contents[len(items)], minifier, version))
+    timings = []
+    minified_content = filecache.cached_minify_many(items, executor or executors.get_executor(), timings)
+    _send_file_minified([filename for kind, filenames in bundles for filename in filenames],
+                        items, minified_content, timings)
+    results = []
+    start = 0
+    for kind, filenames in bundles:
+        results.append('\n'.join(minified_content[start:start + len(filenames)]))
+        start += len(filenames)
+    return results
+
+def minify_js(file_content, mappings=None):
     """Minifies Javascript content using JSMin
     
     Params:
         - ``filename``: the filename of the Javascript file
           within ``app_settings.MINIFY_JS_PATH``
+        - ``mappings`` (optional): a list filled with output to input
+          offsets, see ``jsmin``
     
     Returns:
          - minified Javascript content
     """
-    return jsmin(file_content)
+    return jsmin(file_content, mappings)
 
 def minify_js_from_url(request, url, nominify=False):
     """Resolve a view given by the url and return and 
@@ -148,36 +501,38 @@ def minify_js_from_url(request, url, nominify=False):
           minified or not
     
     Returns:
-        - minified or not minified Javascript content from a view
-    """
-    url_split = request.GET['url'].split('?')
-    url = url_split[0]
-    query_string = None
-    if len(url_split)>1:
-        query_string = url_split[1]
-    view, args, kwargs = urlresolvers.resolve(url)
-    if query_string:
-        request.GET = request.GET.copy() #make request.GET immutable
-        for get_items in query_string.split('&'):
-            get_key, get_value = get_items.split('=')
-            request.GET[get_key] = get_value
-    kwargs['request'] = request        
+        - minified or not minified Javascript content from a view,
+          the minified content is cached if the view is decorated
+          with ``dynamic.cacheable``
+    """
+    path, _, query_string = url.partition('?')
+    view, args, kwargs = urlresolvers.resolve(path)
+    #the view gets the parameters of the url in addition to the
+    #ones of the request, without changing the request
+    view_request = copy.copy(request)
+    view_request.GET = request.GET.copy()
+    for key, values in http.QueryDict(query_string).lists():
+        view_request.GET.setlist(key, values)
+    kwargs['request'] = view_request
     if nominify is False:
-        return jsmin(view(*args, **kwargs).content)
+        return dynamic.get_minified(view_request, view, url,
+                                    lambda: jsmin(view(*args, **kwargs).content))
     else:
         return view(*args, **kwargs)
 
-def minify_css(file_content):
-    """Minifies CSS content
+def minify_css(file_content, mappings=None):
+    """Minifies CSS content using cssmin
     
     Params:
         - ``filename``: the filename of the css file
           within ``app_settings.MINIFY_CSS_PATH``
+        - ``mappings`` (optional): a list filled with output to input
+          offsets, see ``cssmin``
     
     Returns:
         - minified CSS content
     """   
-    return file_content.replace('\t', '').replace('\n', '').replace(', ', ',').replace(': ', ':').replace(' {', '{').replace('} ', '}')
+    return cssmin(file_content, mappings)
 
 def nominify_from_files(request, filenames):
     """Utilizes to explicitly not minifying the content
@@ -192,10 +547,63 @@ def nominify_from_files(request, filenames):
         - combined but not minified file content from given
           files in filenames
     """
+    return '\n'.join(read_files(request, filenames))
+
+def _source_url(kind, filename):
+    """Returns the url of the not minified file used in source maps"""
+    return '%s?file=%s' % (urlresolvers.reverse('nominify_%s' % kind), filename)
+
+def source_map_from_files(request, kind, filenames, line=0):
+    """Builds the source map of the minified and combined content
+    of the given files, like returned by ``minify_from_files``.
+    
+    Params:
+        - ``request``: a django.http.HttpRequest object
+        - ``kind``: ``'js'`` or ``'css'``
+        - ``filenames``: a list of filenames or file paths within
+          ``app_settings.MINIFY_PATHS``
+        - ``line`` (optional): the line of the response the minified
+          content starts at
+    
+    Returns:
+        - a ``sourcemap.SourceMap``
+    """
+    minifier = MINIFIERS[kind][0]
+    source_map = sourcemap.SourceMap()
+    for filename in filenames:
+        file_content = check_and_read_from_file(request, filename)
+        offsets = []
+        minified_content = minifier(file_content, offsets)
+        source = source_map.add_source(_source_url(kind, filename), file_content)
+        source_map.add_offsets(line, source, minified_content, file_content, offsets)
+        line += sourcemap.count_lines(minified_content)
+    return source_map
+
+def nominify_bundle(request, kind, filenames):
+    """Combines the files given in filenames without minifying
+    them, with an inline source map pointing to the single files.
+    
+    Params:
+        - ``request``: a django.http.HttpRequest object
+        - ``kind``: ``'js'`` or ``'css'``
+        - ``filenames``: a list of filenames or file paths within
+          ``app_settings.MINIFY_PATHS``
+    
+    Returns:
+        - combined but not minified file content from given
+          files in filenames, ending with a ``sourceMappingURL`` comment
+    """
+    source_map = sourcemap.SourceMap()
     not_minified_content = []
+    line = 0
     for filename in filenames:
         file_content = check_and_read_from_file(request, filename)
+        source = source_map.add_source(_source_url(kind, filename), file_content)
+        lines = sourcemap.count_lines(file_content)
+        source_map.add_lines(line, source, lines)
+        line += lines
         not_minified_content.append(file_content)
+    not_minified_content.append(sourcemap.source_mapping_comment(kind, source_map.data_url()))
     return '\n'.join(not_minified_content)
 
 def nominify_js_from_files(request, filenames):
@@ -227,3 +635,10 @@ def nominify_css_from_files(request, filenames):
         - not minified (but combined) CSS
     """
     return nominify_from_files(request, filenames)
+
+MINIFIERS = {
+    'js': (minify_js, JS_VERSION),
+    'css': (minify_css, CSS_VERSION),
+}
+
+instrumentation.install()
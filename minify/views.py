@@ -2,46 +2,346 @@
 Views
 """
 
+import datetime
+import itertools
 import os
+import time
 
 from django import http
+from django.core import urlresolvers
+from django.core.cache import cache
+from django.utils import cache as cache_utils
+from django.utils.http import http_date
 from django.views.decorators import cache as cache_decorators
+from django.views.decorators import http as http_decorators
 
 from minify import app_settings
+from minify import bundlecache
+from minify import compress
+from minify import devcache
+from minify import dynamic
+from minify import signals
+from minify import sourcemap
 from minify import utils
 
 CSS_JS_EXPIRES =  app_settings.MINIFY_CSS_JS_EXPIRES
 CACHE_DURATION =  app_settings.MINIFY_CACHE_DURATION
 PRIVATE = app_settings.MINIFY_HEADER_CACHE_PRIVATE
 MAX_AGE = CSS_JS_EXPIRES * 24 * 60 * 60
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+#Django < 1.5 streams an HttpResponse with an iterator as its content
+StreamingHttpResponse = getattr(http, 'StreamingHttpResponse', http.HttpResponse)
+#Django >= 1.8 lets the WSGI server send files with its ``wsgi.file_wrapper``
+FileResponse = getattr(http, 'FileResponse', None)
+FILE_CHUNK_SIZE = 64 * 1024
+CACHE_CONTROL = dict(private=PRIVATE, must_revalidate=True, max_age=MAX_AGE, proxy_revalidate=True, s_max_age=MAX_AGE)
 
-@cache_decorators.cache_page(CACHE_DURATION)
-@cache_decorators.cache_control(private=PRIVATE, must_revalidate=True, max_age=MAX_AGE, proxy_revalidate=True, s_max_age=MAX_AGE)
-def js_minify(request):
-    """View to render minified/combined Javascript
+def _split_files(request):
+    """Returns the normalized list of files of a minify request"""
+    return bundlecache.normalize_files(request.GET.get('files', '').split(','))
+
+def _get_files(request):
+    """Returns the list of files of a minify request, or ``None`` if
+    its content also depends on a view (``url``)."""
+    if request.GET.get('url'):
+        return None
+    return _split_files(request)
+
+def _get_encoding(request):
+    """Returns the encoding of the precompressed variant to respond
+    with to a minify request, or ``None``"""
+    if not _get_files(request):
+        return None
+    return compress.choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+
+def _etag(request):
+    """ETag of a minify response, a digest of the content of its files
+    and the encoding of the response"""
+    files = _get_files(request)
+    if files:
+        version = utils.get_files_version(files)
+        encoding = _get_encoding(request)
+        if version and encoding:
+            return '%s-%s' % (version, encoding)
+        return version
+    return None
+
+def _last_modified(request):
+    """Last-Modified of a minify response, the modification time of its newest file"""
+    files = _get_files(request)
+    if files:
+        last_modified = utils.get_files_last_modified(files)
+        if last_modified is not None:
+            return datetime.datetime.utcfromtimestamp(last_modified)
+    return None
+
+def _nominify_etag(request):
+    """ETag of a nominify response, a digest of the content of its file(s)"""
+    if request.GET.get('file'):
+        return utils.get_file_digest(request.GET['file'])
+    files = _get_files(request)
+    if files:
+        return utils.get_files_version(files)
+    return None
+
+def _patch_cache_control(request, response, files):
+    """Sets the Cache-Control header of a minified response.
+    If the version given in the request (``v``) is the current
+    version of the files the response is cached for a year
+    without revalidation, otherwise for ``MINIFY_CSS_JS_EXPIRES`` days.
+    
+    Params:
+        - ``request``: a ``django.http.HttpRequest`` object
+        - ``response``: the ``django.http.HttpResponse`` to patch
+        - ``files``: the list of files of the response
+    """
+    version = request.GET.get('v')
+    if version and not request.GET.get('url') and version == utils.get_files_version(files):
+        if PRIVATE:
+            cache_utils.patch_cache_control(response, private=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+        else:
+            cache_utils.patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+        response['Expires'] = http_date(time.time() + IMMUTABLE_MAX_AGE)
+    else:
+        cache_utils.patch_cache_control(response, **CACHE_CONTROL)
+        response['Expires'] = http_date(time.time() + MAX_AGE)
+
+def _minified_response(request, kind, files, chunks_func, mimetype, cache_bundle=True):
+    """Builds the response of a minify view. If the client accepts it
+    and the files have a version the response is a precompressed variant
+    of the content. Otherwise the content comes from the bundle cache,
+    or is streamed if it isn't cached and ``MINIFY_STREAMING`` is on.
+    While another request builds the bundle the content of its previous
+    version is sent, without letting clients cache it.
     
     Params:
         - ``request``: a ``django.http.HttpRequest`` object
+        - ``kind``: ``'js'`` or ``'css'``
+        - ``files``: the list of files of the response
+        - ``chunks_func``: a function returning an iterator over the
+          minified content, called with a flag if it should minify the
+          files one at a time (streaming) or all at once
+        - ``mimetype``: the mimetype of the response
+        - ``cache_bundle`` (optional): a flag if the content should be
+          cached as a whole, ``False`` if the chunks cache their parts.
+          Only versioned files on disk are cached, the output of views
+          and remote files may depend on the request.
     
     Returns:
-        - ``respons``e: a ``django.http.HttpResponse`` with combined
-          and minified Javascript as its content 
+        - ``response``: a ``django.http.HttpResponse``
     """
-    res = ''    
-    files = []
+    start = time.time()
     url = request.GET.get('url')
+    version = not url and utils.get_files_version(files)
+    cache_bundle = cache_bundle and bool(version)
+    comment = not url and _source_mapping_comment(kind, files) or ''
+    built = []
+    def build_func():
+        built.append(True)
+        return ''.join(chunks_func(False))
+    stale = []
+    def content_func():
+        if not cache_bundle:
+            return build_func() + comment
+        content, is_stale = bundlecache.get_bundle_or_stale(kind, files, build_func, url)
+        if is_stale:
+            stale.append(content + comment)
+            return None
+        return content + comment
+    encoding = _get_encoding(request)
+    response = None
+    if encoding and version:
+        content = compress.get_compressed(kind, version, encoding, content_func)
+        if content is not None:
+            response = http.HttpResponse(content, mimetype=mimetype)
+            response['Content-Encoding'] = encoding
+    elif app_settings.MINIFY_STREAMING:
+        content = cache_bundle and bundlecache.get_cached(kind, files, url) or None
+        if content is None:
+            built.append(True)
+            response = StreamingHttpResponse(itertools.chain(chunks_func(True), [comment]),
+                                             mimetype=mimetype)
+        else:
+            content += comment
+            response = http.HttpResponse(content, mimetype=mimetype)
+    else:
+        content = content_func()
+        if content is not None:
+            response = http.HttpResponse(content, mimetype=mimetype)
+    if stale:
+        #the bundle is being rebuilt, the content of its previous version
+        #must not be cached as the current one
+        content = stale[0]
+        response = http.HttpResponse(content, mimetype=mimetype)
+        cache_utils.add_never_cache_headers(response)
+    else:
+        _patch_cache_control(request, response, files)
+    if app_settings.MINIFY_PRECOMPRESS and _get_files(request):
+        cache_utils.patch_vary_headers(response, ('Accept-Encoding',))
+    size = None
+    if content is not None:
+        size = len(content)
+    signals.bundle_served.send(sender=kind, files=files, seconds=time.time() - start, size=size,
+                               cached=not built, encoding=response.get('Content-Encoding', None))
+    return response
+
+class FileChunks(object):
+    """Iterates over an open file in chunks of ``chunk_size`` bytes,
+    starting at the beginning of the file every time, so the content
+    of a response can be read more than once (like ``response.content``
+    does with Django < 1.5). The file is closed together with the response.
+    """
+    
+    def __init__(self, file, chunk_size=FILE_CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+    
+    def __iter__(self):
+        self.file.seek(0)
+        while True:
+            chunk = self.file.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    
+    def close(self):
+        self.file.close()
+
+def _file_response(request, filename, mimetype):
+    """Builds the response of a nominify view. A file on disk is sent
+    from the dev cache if it is on, otherwise in chunks straight from
+    the open file (by ``sendfile`` if the WSGI server supports it),
+    without reading it into memory first.
+    
+    Params:
+        - ``request``: a ``django.http.HttpRequest`` object
+        - ``filename``: the file given in the request, see
+          ``utils.check_and_read_from_file``
+        - ``mimetype``: the mimetype of the response
+    
+    Returns:
+        - ``response``: a ``django.http.HttpResponse``
+    """
+    file_path = utils.get_file_path(filename)
+    if file_path is None:
+        return http.HttpResponse(utils.check_and_read_from_file(request, filename),
+                                 mimetype=mimetype)
+    dev_cache = devcache.get_dev_cache()
+    if dev_cache is not None:
+        return http.HttpResponse(dev_cache.read(file_path), mimetype=mimetype)
+    file = open(file_path, 'rb')
+    size = os.fstat(file.fileno()).st_size
+    if FileResponse is not None:
+        response = FileResponse(file, content_type=mimetype)
+    else:
+        response = StreamingHttpResponse(FileChunks(file), mimetype=mimetype)
+    response['Content-Length'] = str(size)
+    return response
+
+def _source_mapping_comment(kind, files):
+    """Returns the comment referencing the source map of a bundle,
+    preceded by a newline, or an empty string if source maps are off"""
+    if not app_settings.MINIFY_SOURCE_MAPS:
+        return ''
+    url = '%s?files=%s' % (urlresolvers.reverse('minify_%s_map' % kind), ','.join(files))
+    version = utils.get_files_version(files)
+    if version:
+        url = '%s&v=%s' % (url, version)
+    return '\n%s' % sourcemap.source_mapping_comment(kind, url)
+
+def _js_chunks(request, files, url, streaming):
     if url:
         minified_js = utils.minify_js_from_url(request, url)
         if minified_js:
-            res = '%s\n%s' % (res, minified_js)
-    if request.GET.get('files'):
-        files = request.GET['files'].split(',')
-        res = '%s\n%s' % (res, utils.minify_js_from_files(request, files))
-    response = http.HttpResponse(res, mimetype='text/javascript')
+            yield '\n'
+            yield minified_js
+    if files:
+        yield '\n'
+        if streaming:
+            for chunk in utils.iter_minify_js_from_files(request, files):
+                yield chunk
+        else:
+            yield utils.minify_js_from_files(request, files)
+
+def _composed_js_chunks(request, files, url):
+    """Like ``_js_chunks`` for a view decorated with ``dynamic.cacheable``,
+    taking the files from the bundle cache"""
+    minified_js = utils.minify_js_from_url(request, url)
+    if minified_js:
+        yield '\n'
+        yield minified_js
+    if files and utils.get_files_version(files):
+        yield bundlecache.get_bundle('js', files, lambda: bundlecache.build_bundle('js', files))
+    elif files:
+        yield '\n'
+        yield utils.minify_js_from_files(request, files)
+
+def _css_chunks(request, files, streaming):
+    if files:
+        if streaming:
+            for chunk in utils.iter_minify_css_from_files(request, files):
+                yield chunk
+        else:
+            yield utils.minify_css_from_files(request, files)
+
+def _source_map_etag(request):
+    """ETag of a source map response, a digest of the content of its files"""
+    files = _get_files(request)
+    if files:
+        return utils.get_files_version(files)
+    return None
+
+def _source_map_response(request, kind):
+    """Builds the response of a source map view. Source maps of files
+    on disk are cached per version of the files.
+    
+    Params:
+        - ``request``: a ``django.http.HttpRequest`` object
+        - ``kind``: ``'js'`` or ``'css'``
+    
+    Returns:
+        - ``response``: a ``django.http.HttpResponse`` with the source map
+    """
+    files = _get_files(request)
+    if not files:
+        raise http.Http404
+    version = utils.get_files_version(files)
+    key = 'minify:sourcemap:%s:%s' % (kind, version)
+    content = version and cache.get(key)
+    if not content:
+        #the minified Javascript of a js_minify response starts at its second line
+        line = kind == 'js' and 1 or 0
+        content = utils.source_map_from_files(request, kind, files, line).to_json()
+        if version:
+            cache.set(key, content, CACHE_DURATION)
+    response = http.HttpResponse(content, mimetype='application/json')
+    _patch_cache_control(request, response, files)
     return response
 
-@cache_decorators.cache_page(CACHE_DURATION)
-@cache_decorators.cache_control(private=PRIVATE, must_revalidate=True, max_age=MAX_AGE, proxy_revalidate=True, s_max_age=MAX_AGE)
+@http_decorators.condition(etag_func=_etag, last_modified_func=_last_modified)
+def js_minify(request):
+    """View to render minified/combined Javascript
+    
+    Params:
+        - ``request``: a ``django.http.HttpRequest`` object
+    
+    Returns:
+        - ``respons``e: a ``django.http.HttpResponse`` with combined
+          and minified Javascript as its content 
+    """
+    files = _split_files(request)
+    url = request.GET.get('url')
+    if url and dynamic.is_cacheable(url):
+        #the output of the view and the files are cached separately,
+        #so a new output of the view doesn't minify the files again
+        return _minified_response(request, 'js', files,
+                                  lambda streaming: _composed_js_chunks(request, files, url),
+                                  'text/javascript', cache_bundle=False)
+    return _minified_response(request, 'js', files,
+                              lambda streaming: _js_chunks(request, files, url, streaming),
+                              'text/javascript')
+
+@http_decorators.condition(etag_func=_etag, last_modified_func=_last_modified)
 def css_minify(request):
     """View to render minified/combined CSS
     
@@ -52,15 +352,39 @@ def css_minify(request):
         - ``response``: a ``django.http.HttpResponse`` with combined
           and minified CSS as its content 
     """
-    res = ''
-    files = [] 
-    if request.GET.get('files'):
-        files = request.GET['files'].split(',')
-        res = utils.minify_css_from_files(request, files)
-    response = http.HttpResponse(res, mimetype='text/css')
-    return response
+    files = _split_files(request)
+    return _minified_response(request, 'css', files,
+                              lambda streaming: _css_chunks(request, files, streaming),
+                              'text/css')
+
+@http_decorators.condition(etag_func=_source_map_etag)
+def js_source_map(request):
+    """View to render the source map of minified/combined Javascript
+    
+    Params:
+        - ``request``: a ``django.http.HttpRequest`` object
+    
+    Returns:
+        - ``response``: a ``django.http.HttpResponse`` with the source
+          map of the ``js_minify`` response of the same files
+    """
+    return _source_map_response(request, 'js')
+
+@http_decorators.condition(etag_func=_source_map_etag)
+def css_source_map(request):
+    """View to render the source map of minified/combined CSS
+    
+    Params:
+        - ``request``: a ``django.http.HttpRequest`` object
+    
+    Returns:
+        - ``response``: a ``django.http.HttpResponse`` with the source
+          map of the ``css_minify`` response of the same files
+    """
+    return _source_map_response(request, 'css')
 
 @cache_decorators.never_cache
+@http_decorators.condition(etag_func=_nominify_etag)
 def js_nominify(request):
     """View to render not minified/not combined Javascript
     
@@ -69,18 +393,20 @@ def js_nominify(request):
     
     Returns:
         - response: a ``django.http.HttpResponse`` with not combined
-          and not minified Javascript as its content 
+          and not minified Javascript as its content, or the files
+          given in ``files`` combined with an inline source map
     """
-    js = ''
     if 'url' in request.GET:
         return utils.minify_js_from_url(request, request.GET['url'], nominify=True)
     if 'file' in request.GET:
-        filename = request.GET['file']
-        js = utils.check_and_read_from_file(request, filename)
-    response = http.HttpResponse(js, mimetype='text/javascript')
-    return response 
+        return _file_response(request, request.GET['file'], 'text/javascript')
+    if _get_files(request):
+        return http.HttpResponse(utils.nominify_bundle(request, 'js', _get_files(request)),
+                                 mimetype='text/javascript')
+    return http.HttpResponse('', mimetype='text/javascript')
 
 @cache_decorators.never_cache
+@http_decorators.condition(etag_func=_nominify_etag)
 def css_nominify(request):
     """View to render not minified/not combined CSS
     
@@ -89,11 +415,12 @@ def css_nominify(request):
     
     Returns:
         - ``response``: a ``django.http.HttpResponse`` with not combined
-        and not minified CSS as its content 
+        and not minified CSS as its content, or the files given in
+        ``files`` combined with an inline source map
     """
-    css = ''
     if 'file' in request.GET:
-        filename = request.GET['file']
-        css = utils.check_and_read_from_file(request, filename)
-    response = http.HttpResponse(css, mimetype='text/css') 
-    return response
+        return _file_response(request, request.GET['file'], 'text/css')
+    if _get_files(request):
+        return http.HttpResponse(utils.nominify_bundle(request, 'css', _get_files(request)),
+                                 mimetype='text/css')
+    return http.HttpResponse('', mimetype='text/css')
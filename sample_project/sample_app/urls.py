@@ -1,5 +1,7 @@
 from django.conf.urls.defaults import *
 
 urlpatterns = patterns('',
-    (r'^$', 'sample_app.views.index')
-)
\ No newline at end of file
+    (r'^$', 'sample_app.views.index'),
+    (r'^config\.js$', 'sample_app.views.config_js'),
+    (r'^visitor\.js$', 'sample_app.views.visitor_js'),
+)
@@ -1,6 +1,27 @@
 # Create your views here.
 
 from django import http, shortcuts
+from django.utils import simplejson
+
+from minify import dynamic
+
+CONFIG = {
+    'version': '1',
+    'debug': False,
+}
 
 def index(request):
-    return shortcuts.render_to_response('index.html')
\ No newline at end of file
+    return shortcuts.render_to_response('index.html')
+
+@dynamic.cacheable(version=lambda request: CONFIG['version'])
+def config_js(request):
+    """Javascript configuration, minified once per version when
+    it is combined with files by the js tag"""
+    return http.HttpResponse('var config = %s;' % simplejson.dumps(CONFIG),
+                             mimetype='text/javascript')
+
+def visitor_js(request):
+    """Javascript depending on the cookies of the visitor, which
+    minify doesn't cache as it isn't decorated with ``dynamic.cacheable``"""
+    return http.HttpResponse('var visitor = %s;' % simplejson.dumps(request.COOKIES.get('visitor')),
+                             mimetype='text/javascript')